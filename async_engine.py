@@ -0,0 +1,371 @@
+# Asyncio scraping engine: one Chromium driven over the DevTools Protocol
+# (through Playwright), many tabs open at once, with an asyncio.Semaphore
+# capping how many tabs are open. The shared DomainLimiter decides how many of
+# them may be loading a profile at once. Replaces the one-firm-at-a-time
+# loop over valid_urls and produces the same Title/Overview/Location/URL/
+# Transactions records, streamed to the usual writers and tracked in the job
+# ledger.
+#
+#   python async_engine.py --concurrency 8
+#   python async_engine.py --cdp-url http://127.0.0.1:9222   # attach to a running Chrome
+import argparse
+import asyncio
+import fnmatch
+import json
+import time
+
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import async_playwright
+
+from driver_factory import BLOCKED_URL_PATTERNS
+from instrumentation import metrics
+from job_ledger import JobLedger, record_hash, url_slug
+from master_list import parse_shard
+from output_writers import open_writers
+from page_cache import PageCache, content_hash
+from page_readiness import (DEFAULT_TIMEOUTS, NEXT_BUTTON_XPATH, OVERVIEW_HEADING_TAGS, OVERVIEW_HEADING_XPATH,
+                            SHOW_MORE_BUTTON_XPATH, TOMBSTONE_SIGNATURE_JS, TOMBSTONE_TAG)
+import pagination
+import rate_limiter
+from page_text import PageTextIndex
+from rate_limiter import DomainLimiter
+from scraper import error_record, load_valid_urls
+from tombstones import TOMBSTONE_JS, error_transaction
+from transaction_history import TransactionHistory
+
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+
+# Everything scrape_company reads from the page before the transactions, in one evaluate
+PROFILE_JS = """() => {
+    var heading = document.evaluate(
+        """ + json.dumps(OVERVIEW_HEADING_XPATH) + """,
+        document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    var sibling = heading ? heading.nextElementSibling : null;
+    var link = document.querySelector('a.u-link');
+    return {
+        bodyText: document.body ? document.body.innerText : '',
+        overview: sibling ? sibling.innerText : null,
+        link: link ? link.href : null
+    };
+}"""
+
+PROFILE_RENDERED_JS = """() => !!(document.querySelector('a.u-link, """ + TOMBSTONE_TAG + """')
+    || Array.from(document.querySelectorAll('""" + ", ".join(OVERVIEW_HEADING_TAGS) + """'))
+        .some(h => h.textContent.includes('Overview')))"""
+
+TOMBSTONES_CHANGED_JS = ("(old) => { var now = (function () { " + TOMBSTONE_SIGNATURE_JS + " })();"
+                         " return !!now && now !== old; }")
+
+EXPAND_DESCRIPTION_JS = """(xpath) => {
+    var button = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (!button || !button.offsetParent) { return false; }
+    button.click();
+    return true;
+}"""
+
+DESCRIPTION_EXPANDED_JS = "() => !document.querySelector('span[more-label]')"
+
+NEXT_BUTTON_STATE_JS = """(xpath) => {
+    var button = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (!button) { return 'missing'; }
+    return ((button.getAttribute('class') || '').includes('disabled') || button.disabled) ? 'disabled' : 'enabled';
+}"""
+
+
+def as_function(body):
+    # Selenium snippets are function bodies; Playwright evaluates expressions
+    return "() => {" + body + "}"
+
+
+async def block_assets(route):
+    # Same patterns the Selenium driver blocks through Network.setBlockedURLs
+    request = route.request
+    if (request.resource_type in BLOCKED_RESOURCE_TYPES
+            or any(fnmatch.fnmatch(request.url, pattern) for pattern in BLOCKED_URL_PATTERNS)):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def read_tombstones(page):
+    with metrics.timer('extract_tombstones'):
+        records = await page.evaluate(as_function(TOMBSTONE_JS)) or []
+    return [record if record is not None else error_transaction() for record in records]
+
+
+async def read_page_info(page):
+    return pagination.browser_page_info(await page.evaluate(as_function(pagination.PAGINATION_JS)))
+
+
+async def load_tombstone_page(context, url, limiter=None):
+    # One later transactions page in its own tab, so several load at once. The
+    # firm already holds a limiter slot, so this only waits for a token.
+    if limiter is not None:
+        await limiter.acquire_async(url, slot=False)
+    outcome = rate_limiter.ERROR
+    page = await context.new_page()
+    try:
+        try:
+            response = await page.goto(url, wait_until="domcontentloaded")
+        except PlaywrightError as e:
+            print(f"Could not open {url}: {e}")
+            return None
+        metrics.count('pages')
+        if response is not None and response.status == 429:
+            outcome = rate_limiter.THROTTLED
+            return None
+        try:
+            await page.wait_for_selector(TOMBSTONE_TAG, timeout=DEFAULT_TIMEOUTS['tombstones'] * 1000)
+        except PlaywrightTimeoutError:
+            outcome = rate_limiter.EMPTY
+            return [], None
+        metrics.count('tombstone_pages')
+        outcome = rate_limiter.OK
+        return await read_tombstones(page), await read_page_info(page)
+    finally:
+        await page.close()
+        if limiter is not None:
+            limiter.release(url, outcome, slot=False)
+
+
+async def scrape_transactions_async(page, known_fingerprints=None, limiter=None):
+    # Same order as scraper.scrape_transactions: later pages by URL in extra
+    # tabs when the pagination control links to them, else by clicking
+    try:
+        await page.wait_for_selector(TOMBSTONE_TAG, timeout=DEFAULT_TIMEOUTS['tombstones'] * 1000)
+    except PlaywrightTimeoutError:
+        return []
+    metrics.count('tombstone_pages')
+    first_page = await read_tombstones(page)
+    collector = pagination.PageCollector(first_page, known_fingerprints)
+    info = None if collector.done else await read_page_info(page)
+
+    if info is not None and info.direct:
+        transactions = await pagination.collect_pages_async(
+            info, first_page, lambda url: load_tombstone_page(page.context, url, limiter), known_fingerprints)
+        if transactions is not None:
+            return transactions
+        # This tab is still on page 1: fall back to clicking through
+
+    while not collector.done and collector.progress.pages < pagination.MAX_PAGES:
+        if await page.evaluate(NEXT_BUTTON_STATE_JS, NEXT_BUTTON_XPATH) != 'enabled':
+            break
+        old_signature = await page.evaluate(as_function(TOMBSTONE_SIGNATURE_JS))
+        with metrics.timer('pagination'):
+            await page.locator(f"xpath={NEXT_BUTTON_XPATH}").first.click()
+            try:
+                await page.wait_for_function(TOMBSTONES_CHANGED_JS, arg=old_signature,
+                                             timeout=DEFAULT_TIMEOUTS['page_change'] * 1000)
+            except PlaywrightTimeoutError:
+                break # Clicking did not change the page; don't read it twice
+        metrics.count('tombstone_pages')
+        if not collector.add(await read_tombstones(page)):
+            break # Only tombstones we already read: the list did not move on
+    return collector.transactions
+
+
+async def scrape_company_async(context, row, known_fingerprints=None, limiter=None, page_cache=None):
+    page = await context.new_page()
+    if limiter is not None:
+        await limiter.acquire_async(row['url'])
+    outcome, latency = rate_limiter.ERROR, None
+    try:
+        started = time.perf_counter()
+        response = await page.goto(row['url'], wait_until="domcontentloaded")
+        metrics.count('pages')
+        if response is not None and response.status == 429:
+            outcome = rate_limiter.THROTTLED
+            raise RuntimeError(f"Throttled by {row['url']} (429)")
+        try:
+            await page.wait_for_function(PROFILE_RENDERED_JS, timeout=DEFAULT_TIMEOUTS['profile'] * 1000)
+        except PlaywrightTimeoutError:
+            pass # Continue with what is on the page, like the Selenium path
+        latency = time.perf_counter() - started
+        metrics.observe('page_load', latency)
+        lap = metrics.stopwatch()
+
+        if await page.evaluate(EXPAND_DESCRIPTION_JS, SHOW_MORE_BUTTON_XPATH):
+            try:
+                await page.wait_for_function(DESCRIPTION_EXPANDED_JS,
+                                             timeout=DEFAULT_TIMEOUTS['description'] * 1000)
+            except PlaywrightTimeoutError:
+                pass
+        lap('description_expand')
+
+        profile = await page.evaluate(PROFILE_JS)
+        lap('read_profile')
+        if page_cache is not None:
+            cached = page_cache.lookup(row['url'], content_hash(profile['bodyText']))
+            if cached is not None:
+                outcome = rate_limiter.OK
+                return cached # Unchanged since the last scrape: no extraction or pagination
+        page_index = PageTextIndex(profile['bodyText'])
+
+        overview_text = profile['overview']
+        if not overview_text or overview_text.strip() == "":
+            overview_text = page_index.extract_section(["Overview", "About Us", "Company Profile"])
+        if not overview_text or overview_text.strip() == "":
+            overview_text = "Overview not found"
+
+        location_text = page_index.extract_section(["Location", "Address", "Contact"])
+        if not location_text or location_text.strip() == "":
+            location_text = "Location not found"
+
+        record = {
+            'Title': row['Title'],
+            'Overview': overview_text,
+            'Location': location_text,
+            'URL': profile['link'] or "URL not found in a.u-link",
+            'Transactions': await scrape_transactions_async(page, known_fingerprints, limiter),
+        }
+        lap('transactions')
+        outcome = rate_limiter.record_outcome(record, bool(known_fingerprints))
+        return record
+    finally:
+        await page.close()
+        if limiter is not None:
+            limiter.release(row['url'], outcome, latency)
+
+
+async def run_job(context, semaphore, job, ledger, writer, history=None, limiter=None, page_cache=None):
+    # The firm's timings start once it has a tab, so waiting for one does not count as work
+    async with semaphore:
+        with metrics.firm(job['Title']):
+            return await scrape_and_record(context, job, ledger, writer, history, limiter, page_cache)
+
+
+async def scrape_and_record(context, job, ledger, writer, history=None, limiter=None, page_cache=None):
+    slug = url_slug(job['url'])
+    known_fingerprints = history.known_fingerprints(slug) if history is not None else None
+    try:
+        record = await scrape_company_async(context, job, known_fingerprints, limiter, page_cache)
+    except Exception as e:
+        print(f"✗ Error processing {job['Title']}: {str(e)}")
+        if page_cache is not None:
+            page_cache.forget(job['url'])
+        if ledger.mark_failed(job['slug'], e):
+            metrics.count('retries')
+            return False
+        metrics.count('errors')
+        with metrics.timer('write'):
+            writer.write(error_record(job, e))
+        return False
+
+    reused = page_cache is not None and page_cache.reused(job['url'])
+    if history is not None and not reused:
+        record['Transactions'] = history.merge(slug, record['Transactions'])
+    if page_cache is not None:
+        page_cache.store(job['url'], record)
+    with metrics.timer('write'):
+        writer.write(record)
+    ledger.mark_done(job['slug'], record_hash(record))
+    print(f"✓ Scraped: {job['Title']}")
+    return True
+
+
+async def scrape_all(ledger, writer, concurrency=8, headless=True, cdp_url=None, history=None, limiter=None,
+                     page_cache=None):
+    async with async_playwright() as playwright:
+        if cdp_url:
+            browser = await playwright.chromium.connect_over_cdp(cdp_url)
+        else:
+            browser = await playwright.chromium.launch(headless=headless)
+        context = await browser.new_context()
+        await context.route("**/*", block_assets)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def worker():
+            # Claims one firm at a time, so the rest of the backlog stays
+            # pending (and claimable by other processes sharing the ledger)
+            scraped = 0
+            while True:
+                job = ledger.claim_next()
+                if job is None:
+                    # Nothing ready: wait for failed firms whose backoff is running
+                    delay = ledger.seconds_until_next_retry()
+                    if delay is None:
+                        return scraped
+                    await asyncio.sleep(delay)
+                    continue
+                scraped += await run_job(context, semaphore, job, ledger, writer, history, limiter, page_cache)
+
+        try:
+            results = await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        finally:
+            await context.close()
+            await browser.close()
+    return sum(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape Axial profiles with many tabs in one browser")
+    parser.add_argument("--concurrency", type=int, default=8, help="maximum number of tabs loading at once")
+    parser.add_argument("--limit", type=int, default=None, help="only scrape the first N firms")
+    parser.add_argument("--shard", default=None,
+                        help="only scrape shard I of N of the master list, e.g. 2/8 (reads just those rows)")
+    parser.add_argument("--cdp-url", default=None, help="attach to a running Chrome instead of launching one")
+    parser.add_argument("--format", default="text,jsonl", help="comma-separated output formats: text, jsonl, parquet, deals")
+    parser.add_argument("--output", default="scraped_data", help="output path without extension")
+    parser.add_argument("--ledger", default="scrape_ledger.db")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only scrape transactions newer than the stored history for each firm")
+    parser.add_argument("--history", default="transaction_history.db")
+    parser.add_argument("--page-cache", default="page_cache.db",
+                        help="reuse the last record of profiles whose page has not changed")
+    parser.add_argument("--cache-ttl", type=float, default=168,
+                        help="hours before a cached profile is scraped in full again")
+    parser.add_argument("--no-page-cache", action="store_true", help="always extract every profile")
+    parser.add_argument("--rate", type=float, default=2.0, help="ceiling on page requests per second to axial.net")
+    parser.add_argument("--show-browser", action="store_true")
+    parser.add_argument("--metrics", default="scrape_metrics.json", help="where to save per-stage timings and counters")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve the metrics as Prometheus text on this port while running")
+    args = parser.parse_args()
+
+    shard = parse_shard(args.shard) if args.shard else None
+    valid_urls = load_valid_urls(stop=args.limit if shard is None else None, shard=shard)
+    if args.limit is not None:
+        valid_urls = valid_urls.head(args.limit)
+
+    ledger = JobLedger(args.ledger)
+    fresh_run = not ledger.has_completed()
+    ledger.sync(row for _, row in valid_urls.iterrows())
+    formats = [f.strip() for f in args.format.split(",") if f.strip()]
+    writer = open_writers(formats, f"{args.output}.txt", f"{args.output}.jsonl", f"{args.output}_parquet")
+    if fresh_run:
+        writer.truncate()
+    history = TransactionHistory(args.history) if args.incremental else None
+    page_cache = None if args.no_page_cache else PageCache(args.page_cache, ttl=args.cache_ttl * 3600)
+    limiter = DomainLimiter(rate=args.rate, initial_concurrency=min(2, args.concurrency),
+                            max_concurrency=args.concurrency)
+
+    if args.metrics_port is not None:
+        metrics.serve(args.metrics_port)
+
+    print(f"Found {len(valid_urls)} companies with valid URLs, up to {args.concurrency} tabs at once")
+    started = time.perf_counter()
+    try:
+        scraped = asyncio.run(scrape_all(ledger, writer, args.concurrency, not args.show_browser,
+                                         args.cdp_url, history, limiter, page_cache))
+    finally:
+        writer.close()
+        if history is not None:
+            history.close()
+    elapsed = time.perf_counter() - started
+
+    print(f"\n=== SCRAPING COMPLETE ===")
+    print(f"{scraped} firms in {elapsed:.1f}s ({scraped / elapsed * 60 if elapsed else 0:.1f} firms/min)")
+    ledger.print_summary()
+    limiter.print_summary()
+    if page_cache is not None:
+        page_cache.print_summary()
+        page_cache.close()
+    metrics.print_summary()
+    if args.metrics:
+        metrics.write_json(args.metrics)
+    ledger.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Benchmark legacy_parser on a synthetic corpus in the scraped_data.txt
+# format: one big file and the same firms as per-firm files.
+#
+#   python benchmark_legacy_parser.py --transactions 100000 --per-firm 20
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+import legacy_parser
+from output_writers import format_text_record
+
+LONG_INDUSTRY = ", ".join(f"Industry segment {i} manufacturing" for i in range(40))
+
+
+def synthetic_records(total_transactions, per_firm):
+    for firm in range((total_transactions + per_firm - 1) // per_firm):
+        count = min(per_firm, total_transactions - firm * per_firm)
+        yield {
+            'Title': f"Synthetic Partners {firm}",
+            'Overview': f"Synthetic Partners {firm} is a private equity firm used for benchmarking.",
+            'Location': f"HQ {firm} Main Street Dallas, TX 75201",
+            'URL': f"https://www.synthetic{firm}.com/",
+            'Transactions': [{
+                'Acquirer/Investor': f"Synthetic Partners {firm}",
+                'Activity': "ACQUIRED",
+                'Company': f"Portfolio Company {firm}-{i}",
+                'Industry': LONG_INDUSTRY if i % 10 == 0 else "IT Services, Software Publishers",
+                'Date': f"June 20{i % 25:02d}",
+            } for i in range(count)],
+        }
+
+
+def write_corpus(directory, total_transactions, per_firm):
+    single_file = os.path.join(directory, "scraped_data.txt")
+    per_firm_dir = os.path.join(directory, "scraped_company_data")
+    os.makedirs(per_firm_dir)
+    with open(single_file, "w", encoding="utf-8") as f:
+        for index, record in enumerate(synthetic_records(total_transactions, per_firm)):
+            text = format_text_record(record)
+            f.write(text)
+            with open(os.path.join(per_firm_dir, f"synthetic-partners-{index}.txt"), "w", encoding="utf-8") as firm_file:
+                firm_file.write(text)
+    return single_file, per_firm_dir
+
+
+def timed(label, func):
+    started = time.perf_counter()
+    transactions = func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<34} {elapsed:7.2f}s  {transactions / elapsed:>10,.0f} transactions/s")
+
+
+def count_transactions(records):
+    return sum(len(r['Transactions']) for r in records if isinstance(r['Transactions'], list))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the legacy text parser")
+    parser.add_argument("--transactions", type=int, default=100000)
+    parser.add_argument("--per-firm", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Writing {args.transactions:,} transactions ({args.per_firm} per firm)...")
+        single_file, per_firm_dir = write_corpus(directory, args.transactions, args.per_firm)
+        print(f"Corpus: {os.path.getsize(single_file) / 1e6:.1f} MB\n")
+
+        timed("single file, streaming", lambda: count_transactions(legacy_parser.iter_file(single_file)))
+        timed("per-firm files, 1 worker", lambda: count_transactions(legacy_parser.iter_directory(per_firm_dir, 1)))
+        timed(f"per-firm files, {args.workers} workers",
+              lambda: count_transactions(legacy_parser.iter_directory(per_firm_dir, args.workers)))
+        timed("transactions DataFrame", lambda: len(legacy_parser.load_transactions(single_file)))
+
+    # ru_maxrss is KiB on Linux
+    print(f"\nPeak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
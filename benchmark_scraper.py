@@ -0,0 +1,165 @@
+# End-to-end benchmark of the scraper.py pipeline (fetch_or_scrape: HTTP
+# backend with Selenium fallback, or Selenium only) against the recorded
+# profile pages in fixtures/profiles/, served by the mock Axial server.
+#
+# The fixture set covers a plain profile, a profile without an Overview
+# section, a click-only paginated tombstone list, a list whose pages have their
+# own ?page=N URLs, a "Show full description" overview and a profile missing
+# Location, website link and transactions. Every record is
+# checked against fixtures/expected.json, and the run reports firms/min,
+# p50/p95 per-firm latency, peak RSS and the per-stage metrics.
+#
+#   python benchmark_scraper.py --repeat 5
+#   python benchmark_scraper.py --backend selenium --latency 0.2 --json bench.json
+#   python benchmark_scraper.py --page-cache bench_cache.db   # repeats reuse unchanged pages
+import argparse
+import json
+import os
+import resource
+import threading
+import time
+
+import http_backend
+from instrumentation import metrics, percentile
+from mock_axial_server import FIXTURE_DIR, start_server
+from page_cache import PageCache
+from scraper import LazyBrowser, fetch_or_scrape
+
+try:
+    import psutil
+except ImportError: # Peak RSS then only covers this Python process
+    psutil = None
+
+EXPECTED_PATH = os.path.join(os.path.dirname(FIXTURE_DIR), "expected.json")
+
+
+class RssSampler(object):
+    # Peak resident memory of this process plus its children (chromedriver,
+    # Chrome and its renderers), sampled in the background
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak_total = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def sample(self):
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        self.peak_total = max(self.peak_total, total)
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        if psutil is not None:
+            self.thread.start()
+        return self
+
+    def stop(self):
+        if psutil is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.sample()
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, self.peak_total or None
+
+
+def compare(record, expected):
+    # Names of the fields that differ from the expected record
+    return [key for key in ('Title', 'Overview', 'Location', 'URL', 'Transactions') if record.get(key) != expected[key]]
+
+
+def run_benchmark(base_url, expected, backend="http", repeat=3, show_browser=False, page_cache=None):
+    browser = LazyBrowser(headless=not show_browser, profile_dir=None)
+    session = http_backend.create_session() if backend == "http" else None
+    latencies = []
+    mismatches = {}
+    try:
+        for _ in range(repeat):
+            for slug, expected_record in expected.items():
+                row = {'Title': expected_record['Title'], 'url': f"{base_url}/company/{slug}"}
+                started = time.perf_counter()
+                with metrics.firm(row['Title']):
+                    record = fetch_or_scrape(row, browser, session, page_cache=page_cache)
+                latencies.append(time.perf_counter() - started)
+                differing = compare(record, expected_record)
+                if differing:
+                    mismatches[slug] = differing
+    finally:
+        browser.quit()
+        if session is not None:
+            session.close()
+    return latencies, mismatches, browser.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraping pipeline against recorded fixture pages")
+    parser.add_argument("--backend", choices=["http", "selenium"], default="http",
+                        help="'http' parses over HTTP and falls back to Chrome, 'selenium' always uses Chrome")
+    parser.add_argument("--repeat", type=int, default=3, help="how many times to scrape every fixture")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock server response time in seconds")
+    parser.add_argument("--show-browser", action="store_true")
+    parser.add_argument("--page-cache", default=None,
+                        help="reuse unchanged pages through this cache (off by default, so every repeat extracts)")
+    parser.add_argument("--json", default=None, help="also save the results to this file")
+    args = parser.parse_args()
+
+    with open(EXPECTED_PATH, encoding="utf-8") as f:
+        expected = json.load(f)
+
+    page_cache = PageCache(args.page_cache) if args.page_cache else None
+    server, base_url = start_server(latency=args.latency)
+    sampler = RssSampler().start()
+    started = time.perf_counter()
+    try:
+        latencies, mismatches, browser_stats = run_benchmark(base_url, expected, args.backend, args.repeat,
+                                                             args.show_browser, page_cache)
+    finally:
+        server.shutdown()
+        if page_cache is not None:
+            page_cache.close()
+    elapsed = time.perf_counter() - started
+    python_rss, total_rss = sampler.stop()
+
+    results = {
+        'backend': args.backend,
+        'firms': len(latencies),
+        'seconds': elapsed,
+        'firms_per_minute': len(latencies) / elapsed * 60 if elapsed else 0.0,
+        'p50_seconds': percentile(latencies, 50),
+        'p95_seconds': percentile(latencies, 95),
+        'max_seconds': max(latencies) if latencies else None,
+        'peak_rss_python_mb': python_rss / 1024 / 1024,
+        'peak_rss_total_mb': total_rss / 1024 / 1024 if total_rss else None,
+        'chrome_starts': browser_stats['starts'],
+        'mismatches': mismatches,
+    }
+
+    print(f"\n=== BENCHMARK ({args.backend}) ===")
+    print(f"{results['firms']} firms in {elapsed:.1f}s: {results['firms_per_minute']:.1f} firms/min")
+    print(f"Per-firm latency: p50 {results['p50_seconds'] * 1000:.0f} ms, p95 {results['p95_seconds'] * 1000:.0f} ms, "
+          f"max {results['max_seconds'] * 1000:.0f} ms")
+    print(f"Peak RSS: {results['peak_rss_python_mb']:.0f} MB Python"
+          + (f", {results['peak_rss_total_mb']:.0f} MB with Chrome" if total_rss else " (install psutil to include Chrome)"))
+    print(f"Chrome starts: {results['chrome_starts']}")
+    if mismatches:
+        for slug, fields in sorted(mismatches.items()):
+            print(f"✗ {slug}: {', '.join(fields)} differ from fixtures/expected.json")
+    else:
+        print(f"✓ All {len(expected)} fixtures match fixtures/expected.json")
+    metrics.print_summary()
+
+    if args.json:
+        results['metrics'] = metrics.snapshot()
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
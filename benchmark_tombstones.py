@@ -0,0 +1,94 @@
+# Compare per-element tombstone extraction with the single execute_script
+# path on a synthetic profile page served locally.
+#
+#   python benchmark_tombstones.py --tombstones 200 --repeat 3
+import argparse
+import os
+import tempfile
+import time
+
+from selenium.webdriver.common.by import By
+
+from mock_axial_server import start_server
+from driver_factory import create_driver
+from tombstones import extract_tombstones_js, extract_tombstones_per_element
+
+TOMBSTONE_HTML = """
+<axl-legacy-tombstone>
+  <div class="tombstone">
+    <div class="tombstone-party">Benchmark Partners</div>
+    <div class="tombstone-activity">ACQUIRED</div>
+    <div class="tombstone-party">Portfolio Company {i}</div>
+    <div class="footer">
+      <span class="u-text-xs-01 u-text-color-secondary">IT Services, Fabricated Metal Product Manufacturing, Industry {i}</span>
+      <span class="u-text-xs-01 u-text-color-secondary">June 20{year:02d}</span>
+    </div>
+  </div>
+</axl-legacy-tombstone>
+"""
+
+
+def write_fixture(directory, count):
+    tombstones = "".join(TOMBSTONE_HTML.format(i=i, year=i % 25) for i in range(count))
+    html = ("<!DOCTYPE html><html><body><main><h3>Overview</h3><p>Synthetic benchmark profile.</p>"
+            f"<h3>Transactions</h3>{tombstones}</main></body></html>")
+    with open(os.path.join(directory, "benchmark-partners.html"), "w", encoding="utf-8") as f:
+        f.write(html)
+
+
+def count_commands(driver):
+    # Every WebDriver command, including WebElement calls, goes through driver.execute
+    counter = {'commands': 0}
+    original = driver.execute
+
+    def execute(*args, **kwargs):
+        counter['commands'] += 1
+        return original(*args, **kwargs)
+
+    driver.execute = execute
+    return counter
+
+
+def run(name, extract, driver, counter, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        counter['commands'] = 0
+        started = time.perf_counter()
+        result = extract()
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    print(f"{name:>8}: best {best * 1000:.1f} ms over {repeat} runs, "
+          f"{counter['commands']} WebDriver commands, {len(result)} transactions")
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tombstone extraction modes")
+    parser.add_argument("--tombstones", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as fixture_dir:
+        write_fixture(fixture_dir, args.tombstones)
+        server, base_url = start_server(fixture_dir=fixture_dir)
+        driver, wait = create_driver(headless=True)
+        try:
+            driver.get(f"{base_url}/company/benchmark-partners")
+            counter = count_commands(driver)
+
+            def per_element():
+                return extract_tombstones_per_element(driver.find_elements(By.TAG_NAME, "axl-legacy-tombstone"))
+
+            element_result, element_time = run("element", per_element, driver, counter, args.repeat)
+            js_result, js_time = run("js", lambda: extract_tombstones_js(driver), driver, counter, args.repeat)
+
+            print(f"Speed-up: {element_time / js_time:.1f}x")
+            print("Results match" if element_result == js_result else "✗ Results differ between modes")
+        finally:
+            driver.quit()
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
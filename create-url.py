@@ -1,42 +1,140 @@
+# Build the Axial profile URL for every firm in the master list.
+#
+# Slugs are generated with vectorized pandas string operations, and only for
+# titles that are not already in the slug cache (keyed on Title), so re-runs
+# after adding a few firms only process those firms. Titles that map to the
+# same URL are reported as collisions and collapsed into one row, so the same
+# page is never scraped twice. The result is written to master_pe_urls.parquet,
+# which the scrapers read instead of the workbook; --excel also writes the
+# url column back into "Master PE List.xlsx" as before.
+#
+#   python create-url.py
+#   python create-url.py --excel
+import argparse
+import os
+
 import pandas as pd
-import re
-
-def create_company_url(company_name):
-    # Remove special characters (keep only letters, numbers, and spaces)
-    clean_name = re.sub(r'[^a-zA-Z0-9\s]', '', company_name)
-    
-    # Convert to lowercase and replace spaces with hyphens
-    url_part = clean_name.lower().replace(" ", "-")
-    
-    # Remove multiple consecutive hyphens and leading/trailing hyphens
-    url_part = re.sub(r'-+', '-', url_part).strip('-')
-    
-    base_url = "https://network.axial.net/company/"
-    return base_url + url_part
-
-def get_special_characters(company_name):
-    # Find all special characters that were removed
-    special_chars = re.findall(r'[^a-zA-Z0-9\s]', company_name)
-    if special_chars:
-        return ', '.join(set(special_chars))  # Remove duplicates
-    return None
-
-df = pd.read_excel("Master PE List.xlsx")
-
-df['url'] = df['Title'].apply(create_company_url)
-df['removed_characters'] = df['Title'].apply(get_special_characters)
-
-# Display results
-for _, row in df.iterrows():
-    if row['removed_characters'] is not None:
-        print(f"{row['Title']} → {row['url']} (removed: {row['removed_characters']})")
+
+from master_list import ROW_GROUP_SIZE, meta_path_for, write_meta
+
+BASE_URL = "https://network.axial.net/company/"
+MASTER_LIST = "Master PE List.xlsx"
+URLS_PATH = "master_pe_urls.parquet"
+SLUG_CACHE_PATH = "slug_cache.parquet"
+COLLISIONS_PATH = "url_collisions.csv"
+
+# Bump when the slug rules below change, so cached slugs are regenerated
+SLUG_VERSION = 1
+
+# Characters dropped from a title to make its slug: anything but letters, digits and spaces
+SPECIAL_CHARS = r'[^a-zA-Z0-9\s]'
+
+
+def company_urls(titles):
+    # Profile URL for every title: special characters dropped, lowercased,
+    # spaces turned into single hyphens, no leading/trailing hyphens
+    slugs = (titles.str.replace(SPECIAL_CHARS, '', regex=True)
+             .str.lower()
+             .str.replace(" ", "-", regex=False)
+             .str.replace(r'-+', '-', regex=True)
+             .str.strip('-'))
+    return BASE_URL + slugs
+
+
+def removed_characters(titles):
+    # The special characters dropped from each title (each once, in order of
+    # appearance), or None when there were none
+    found = titles.str.findall(SPECIAL_CHARS)
+    return found.map(lambda chars: ', '.join(dict.fromkeys(chars)) if chars else None)
+
+
+def load_slug_cache(path=SLUG_CACHE_PATH):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['Title', 'url', 'removed_characters', 'version'])
+    cache = pd.read_parquet(path)
+    return cache[cache['version'] == SLUG_VERSION]
+
+
+def slugs_for(titles, cache_path=SLUG_CACHE_PATH):
+    # Returns (Title -> url/removed_characters table, titles processed this run)
+    cache = load_slug_cache(cache_path)
+    unique_titles = pd.Series(titles.dropna().unique(), name='Title')
+    new_titles = unique_titles[~unique_titles.isin(cache['Title'])]
+
+    if len(new_titles):
+        fresh = pd.DataFrame({
+            'Title': new_titles.values,
+            'url': company_urls(new_titles).values,
+            'removed_characters': removed_characters(new_titles).values,
+            'version': SLUG_VERSION,
+        })
+        cache = pd.concat([cache, fresh], ignore_index=True) if len(cache) else fresh
+        cache.to_parquet(cache_path, index=False)
     else:
-        print(f"{row['Title']} → {row['url']}")
+        fresh = cache.iloc[0:0]
+
+    return cache[cache['Title'].isin(unique_titles)], fresh
+
+
+def dedupe_by_url(df):
+    # Keep the first firm for each URL; the titles folded into it are listed in
+    # 'aliases'. Returns (deduped frame, collisions frame).
+    with_url = df[df['url'].notna()]
+    duplicated = with_url['url'].duplicated(keep=False)
+    collisions = with_url.loc[duplicated, ['url', 'Title']].sort_values(['url', 'Title'])
+
+    aliases = (collisions.groupby('url')['Title']
+               .agg(lambda group: ' | '.join(dict.fromkeys(group))))
+    deduped = df[~(df['url'].notna() & df['url'].duplicated(keep='first'))].copy()
+    deduped['aliases'] = deduped['url'].map(aliases)
+    return deduped, collisions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate Axial profile URLs for the master PE list")
+    parser.add_argument("--input", default=MASTER_LIST)
+    parser.add_argument("--output", default=URLS_PATH, help="Parquet file the scrapers read")
+    parser.add_argument("--cache", default=SLUG_CACHE_PATH, help="slug cache keyed on Title")
+    parser.add_argument("--excel", action="store_true", help="also write the url column back into the workbook")
+    args = parser.parse_args()
+
+    df = pd.read_excel(args.input)
+    slugs, fresh = slugs_for(df['Title'], args.cache)
+    df = df.drop(columns=['url', 'removed_characters'], errors='ignore')
+    df = df.merge(slugs[['Title', 'url', 'removed_characters']], on='Title', how='left')
+
+    # Display the titles generated this run
+    for title, url, removed in zip(fresh['Title'], fresh['url'], fresh['removed_characters']):
+        if pd.notna(removed):
+            print(f"{title} → {url} (removed: {removed})")
+        else:
+            print(f"{title} → {url}")
+
+    deduped, collisions = dedupe_by_url(df)
+    if len(collisions):
+        collisions.to_csv(COLLISIONS_PATH, index=False)
+        for url, group in collisions.groupby('url'):
+            print(f"✗ Collision: {' / '.join(dict.fromkeys(group['Title']))} → {url}")
+
+    print(f"\nSummary:")
+    print(f"Total companies: {len(df)}")
+    print(f"URLs created this run: {len(fresh)} (from cache: {len(slugs) - len(fresh)})")
+    print(f"Companies with special characters removed: {df['removed_characters'].notna().sum()}")
+    print(f"URL collisions: {collisions['url'].nunique()} URLs shared by {len(collisions)} rows"
+          + (f" (see {COLLISIONS_PATH})" if len(collisions) else ""))
+    print(f"Unique firms to scrape: {len(deduped)}")
+
+    if args.excel:
+        # The old behaviour: the whole workbook with its url column
+        df.to_excel(args.input, index=False)
+        print(f"Updated {args.input}")
+
+    # Same row groups as the input snapshots, so a shard only reads the groups it overlaps
+    deduped.to_parquet(args.output, index=False, row_group_size=ROW_GROUP_SIZE)
+    # Which workbook this was built from, so the scrapers keep using it until the workbook changes
+    write_meta(args.input, meta_path_for(args.output), len(deduped))
+    print(f"Saved {args.output}")
 
-print(f"\nSummary:")
-print(f"Total companies: {len(df)}")
-print(f"URLs created: {len(df)}")
-print(f"Companies with special characters removed: {df['removed_characters'].notna().sum()}")
 
-# Save the DataFrame back to Excel
-df.to_excel("Master PE List.xlsx", index=False)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+# Normalized, deduplicated store of every deal seen across firms.
+#
+# The same deal shows up on the acquirer's and on the target's profile, so
+# deals are keyed on a canonical form of (acquirer, company, activity,
+# year-month): names lowercased, punctuation and legal suffixes (LLC, Inc.,
+# ...) dropped. When the company is withheld ("Undisclosed", "Anonymous")
+# the industry joins the key, so one acquirer's unnamed deals in the same
+# month stay apart. Each firm whose profile listed the deal is kept in
+# deal_sources, and the comma-separated industry list is split into
+# deal_industries. With indexes on company, acquirer, industry, activity and
+# the parsed year/month, queries like "all ACQUIRED deals in IT Services in
+# 2025" are index lookups instead of a pass over the text files. 'Error'
+# placeholder rows are never stored.
+#
+#   python deal_store.py import scraped_data.txt
+#   python deal_store.py query --activity ACQUIRED --industry "IT Services" --year 2025
+import argparse
+import json
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from transaction_history import TRANSACTION_FIELDS, is_placeholder
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deals (
+    id INTEGER PRIMARY KEY,
+    deal_key TEXT NOT NULL UNIQUE,
+    acquirer TEXT,
+    activity TEXT,
+    company TEXT,
+    industry TEXT,
+    date TEXT,
+    year INTEGER,
+    month INTEGER,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deal_sources (
+    deal_id INTEGER NOT NULL REFERENCES deals (id),
+    firm TEXT NOT NULL,
+    PRIMARY KEY (deal_id, firm)
+);
+CREATE TABLE IF NOT EXISTS deal_industries (
+    deal_id INTEGER NOT NULL REFERENCES deals (id),
+    industry TEXT NOT NULL COLLATE NOCASE,
+    PRIMARY KEY (industry, deal_id)
+);
+CREATE INDEX IF NOT EXISTS deals_company ON deals (company COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS deals_acquirer ON deals (acquirer COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS deals_activity_date ON deals (activity COLLATE NOCASE, year, month);
+CREATE INDEX IF NOT EXISTS deals_date ON deals (year, month);
+CREATE INDEX IF NOT EXISTS deal_sources_firm ON deal_sources (firm);
+"""
+
+# Bump when deal_key or the indexes change; older stores are migrated on open
+SCHEMA_VERSION = 2
+
+MONTHS = {name: number for number, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+
+LEGAL_SUFFIXES = {"llc", "inc", "incorporated", "corp", "corporation", "co", "ltd", "limited",
+                  "lp", "llp", "plc", "lllp", "pllc", "the"}
+
+# Industry names are joined with ", " but some names contain commas themselves
+# ("Paint, Coating, and Adhesive Manufacturing", "Door locks, metal,
+# manufacturing"). A piece is glued back onto the previous one when it starts
+# in lowercase or the previous one has an unclosed parenthesis; a piece
+# starting with "and"/"or" also takes the short or semicolon-separated pieces
+# just before it, unless they already end like a complete industry name.
+LIST_CONTINUATION = re.compile(r'^(and|or|&)\s', re.IGNORECASE)
+MAX_NAME_PIECE_WORDS = 3
+INDUSTRY_ENDINGS = {"services", "manufacturing", "distributors", "wholesalers", "wholesaler", "retailers",
+                    "stores", "dealers", "contractors", "providers", "software", "construction", "care"}
+
+# Canonical company names that stand in for a withheld target
+PLACEHOLDER_COMPANIES = {"", "anonymous", "undisclosed", "undisclosed company", "undisclosed target",
+                         "confidential", "confidential company", "private company", "unknown", "n a", "na",
+                         "not disclosed", "stealth"}
+
+YEAR_RE = re.compile(r'\b(19|20)\d{2}\b')
+NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+
+def parse_deal_date(text):
+    # (year, month) from "June 2025", "Jun 2025", "06/2025", "2025-06" or "2025"; None where unknown
+    if not text:
+        return None, None
+    year_match = YEAR_RE.search(text)
+    year = int(year_match.group(0)) if year_match else None
+    month = None
+    lowered = text.lower()
+    for word in re.findall(r'[a-z]+', lowered):
+        if word[:3] in MONTHS:
+            month = MONTHS[word[:3]]
+            break
+    if month is None:
+        numeric = re.search(r'\b(\d{1,2})[/-](?:19|20)\d{2}\b|\b(?:19|20)\d{2}-(\d{1,2})\b', lowered)
+        if numeric:
+            value = int(numeric.group(1) or numeric.group(2))
+            month = value if 1 <= value <= 12 else None
+    return year, month
+
+
+def canonical_name(name):
+    words = NON_WORD_RE.sub(" ", (name or "").lower()).split()
+    while words and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    while words and words[0] == "the":
+        words.pop(0)
+    return " ".join(words)
+
+
+def deal_key(transaction):
+    year, month = parse_deal_date(transaction.get('Date'))
+    date_part = f"{year or ''}-{month or ''}" if year else canonical_name(transaction.get('Date'))
+    company = canonical_name(transaction.get('Company'))
+    parts = [canonical_name(transaction.get('Acquirer/Investor')), company,
+             canonical_name(transaction.get('Activity')), date_part]
+    if company in PLACEHOLDER_COMPANIES:
+        parts.append(canonical_name(transaction.get('Industry')))
+    return "|".join(parts)
+
+
+def split_industries(text):
+    if not text or text == 'N/A':
+        return []
+    industries = []
+    for piece in (piece.strip() for piece in text.split(",")):
+        if not piece:
+            continue
+        if industries and LIST_CONTINUATION.match(piece):
+            merged = [piece]
+            while industries and industries[-1].split()[-1].lower() not in INDUSTRY_ENDINGS and (
+                    len(industries[-1].split()) <= MAX_NAME_PIECE_WORDS or ";" in industries[-1]):
+                merged.insert(0, industries.pop())
+            piece = ", ".join(merged)
+        elif industries and (piece[0].islower() or industries[-1].count("(") > industries[-1].count(")")):
+            industries[-1] = f"{industries[-1]}, {piece}"
+            continue
+        industries.append(piece)
+    return industries
+
+
+class DealStore(object):
+    def __init__(self, path="deals.db"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        with self.lock:
+            if self.conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                self.migrate_locked()
+
+    def migrate_locked(self):
+        # Recompute every deal_key with the current rules (deals with a
+        # placeholder company gained the industry in version 2), merging rows
+        # that now share a key, and rebuild the activity index case-insensitively
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            keys = {}
+            rows = self.conn.execute("SELECT id, deal_key, acquirer, activity, company, industry, date FROM deals "
+                                     "ORDER BY id").fetchall()
+            for deal_id, old_key, *values in rows:
+                key = deal_key(dict(zip(TRANSACTION_FIELDS, values)))
+                if key in keys:
+                    # Same deal under the new rules: keep the first row and its sources
+                    kept = keys[key]
+                    for table, column in (("deal_sources", "firm"), ("deal_industries", "industry")):
+                        self.conn.execute(f"INSERT OR IGNORE INTO {table} SELECT ?, {column} FROM {table} "
+                                          f"WHERE deal_id = ?", (kept, deal_id))
+                        self.conn.execute(f"DELETE FROM {table} WHERE deal_id = ?", (deal_id,))
+                    self.conn.execute("UPDATE deals SET first_seen = MIN(first_seen, (SELECT first_seen FROM deals "
+                                      "WHERE id = ?)), last_seen = MAX(last_seen, (SELECT last_seen FROM deals "
+                                      "WHERE id = ?)) WHERE id = ?", (deal_id, deal_id, kept))
+                    self.conn.execute("DELETE FROM deals WHERE id = ?", (deal_id,))
+                    continue
+                keys[key] = deal_id
+                if key != old_key:
+                    # Park the row under a temporary key first, so renaming never hits the UNIQUE constraint
+                    self.conn.execute("UPDATE deals SET deal_key = ? WHERE id = ?", (f"\u0000{deal_id}", deal_id))
+            for key, deal_id in keys.items():
+                self.conn.execute("UPDATE deals SET deal_key = ? WHERE id = ? AND deal_key != ?", (key, deal_id, key))
+            self.conn.execute("DROP INDEX IF EXISTS deals_activity_date")
+            self.conn.execute("CREATE INDEX deals_activity_date ON deals (activity COLLATE NOCASE, year, month)")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def add_record(self, record):
+        return self.add_records([record])
+
+    def add_records(self, records):
+        # Store every transaction of the given firm records in one transaction.
+        # Returns {'new', 'duplicate', 'skipped'} counts.
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        counts = {'new': 0, 'duplicate': 0, 'skipped': 0}
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                for record in records:
+                    if not isinstance(record['Transactions'], list):
+                        continue
+                    for transaction in record['Transactions']:
+                        if is_placeholder(transaction):
+                            counts['skipped'] += 1
+                            continue
+                        counts[self.add_locked(record['Title'], transaction, now)] += 1
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return counts
+
+    def add_locked(self, firm, transaction, now):
+        key = deal_key(transaction)
+        row = self.conn.execute("SELECT id FROM deals WHERE deal_key = ?", (key,)).fetchone()
+        if row is not None:
+            deal_id = row[0]
+            self.conn.execute("UPDATE deals SET last_seen = ? WHERE id = ?", (now, deal_id))
+            self.conn.execute("INSERT OR IGNORE INTO deal_sources VALUES (?, ?)", (deal_id, firm))
+            return 'duplicate'
+        year, month = parse_deal_date(transaction.get('Date'))
+        values = [transaction.get(field, 'N/A') for field in TRANSACTION_FIELDS]
+        deal_id = self.conn.execute(
+            "INSERT INTO deals (deal_key, acquirer, activity, company, industry, date, year, month, first_seen, last_seen)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, *values, year, month, now, now)).lastrowid
+        self.conn.execute("INSERT INTO deal_sources VALUES (?, ?)", (deal_id, firm))
+        self.conn.executemany("INSERT OR IGNORE INTO deal_industries VALUES (?, ?)",
+                              ((deal_id, industry) for industry in split_industries(values[3])))
+        return 'new'
+
+    def find(self, activity=None, industry=None, year=None, month=None, company=None, acquirer=None, firm=None,
+             limit=None):
+        # Deals matching every given filter (text filters match case-insensitively),
+        # newest first, each with the firms whose profiles listed it
+        joins = []
+        conditions = []
+        params = []
+        if industry is not None:
+            joins.append("JOIN deal_industries i ON i.deal_id = d.id")
+            conditions.append("i.industry = ?")
+            params.append(industry)
+        if firm is not None:
+            joins.append("JOIN deal_sources f ON f.deal_id = d.id")
+            conditions.append("f.firm = ?")
+            params.append(firm)
+        for column, value in (("year", year), ("month", month)):
+            if value is not None:
+                conditions.append(f"d.{column} = ?")
+                params.append(value)
+        for column, value in (("activity", activity), ("company", company), ("acquirer", acquirer)):
+            if value is not None:
+                conditions.append(f"d.{column} = ? COLLATE NOCASE")
+                params.append(value)
+        query = ("SELECT d.id, d.acquirer, d.activity, d.company, d.industry, d.date FROM deals d "
+                 + " ".join(joins)
+                 + (" WHERE " + " AND ".join(conditions) if conditions else "")
+                 + " ORDER BY d.year DESC, d.month DESC, d.id")
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+            deals = []
+            for row in rows:
+                deal = dict(zip(TRANSACTION_FIELDS, ('N/A' if value is None else value for value in row[1:])))
+                deal['Sources'] = [firm for (firm,) in self.conn.execute(
+                    "SELECT firm FROM deal_sources WHERE deal_id = ? ORDER BY firm", (row[0],))]
+                deals.append(deal)
+        return deals
+
+    def counts(self):
+        with self.lock:
+            deals = self.conn.execute("SELECT COUNT(*) FROM deals").fetchone()[0]
+            sources = self.conn.execute("SELECT COUNT(*) FROM deal_sources").fetchone()[0]
+            firms = self.conn.execute("SELECT COUNT(DISTINCT firm) FROM deal_sources").fetchone()[0]
+        return {'deals': deals, 'listings': sources, 'firms': firms}
+
+    def print_summary(self):
+        counts = self.counts()
+        print(f"\n=== DEAL STORE ===")
+        print(f"{counts['deals']} unique deals from {counts['listings']} listings across {counts['firms']} firms "
+              f"({self.path})")
+
+    def close(self):
+        self.conn.close()
+
+
+class DealStoreWriter(object):
+    # Output writer (see output_writers.open_writers) feeding each finished
+    # firm into the store. The store accumulates across runs, so truncate()
+    # keeps what is there: seeing a deal again only updates last_seen.
+    def __init__(self, path="deals.db"):
+        self.store = DealStore(path)
+
+    def write(self, record):
+        self.store.add_record(record)
+
+    def truncate(self):
+        pass
+
+    def close(self):
+        self.store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicated cross-firm deal index")
+    parser.add_argument("--db", default="deals.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="load scraped_data.txt, a per-firm directory or a .jsonl file")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--workers", type=int, default=8)
+    query_parser = commands.add_parser("query", help="list deals matching all the given filters")
+    query_parser.add_argument("--activity")
+    query_parser.add_argument("--industry")
+    query_parser.add_argument("--year", type=int)
+    query_parser.add_argument("--month", type=int)
+    query_parser.add_argument("--company")
+    query_parser.add_argument("--acquirer")
+    query_parser.add_argument("--firm", help="deals listed on this firm's profile")
+    query_parser.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    store = DealStore(args.db)
+    try:
+        if args.command == "import":
+            if args.path.endswith(".jsonl"):
+                with open(args.path, encoding="utf-8") as f:
+                    records = (json.loads(line) for line in f if line.strip())
+                    counts = store.add_records(records)
+            else:
+                from legacy_parser import iter_archive
+                counts = store.add_records(iter_archive(args.path, args.workers))
+            print(f"{counts['new']} new deals, {counts['duplicate']} already known, "
+                  f"{counts['skipped']} error placeholders skipped")
+            store.print_summary()
+        else:
+            started = time.perf_counter()
+            deals = store.find(args.activity, args.industry, args.year, args.month, args.company, args.acquirer,
+                               args.firm, args.limit)
+            elapsed = time.perf_counter() - started
+            for deal in deals:
+                print(f"{deal['Date']}: {deal['Acquirer/Investor']} {deal['Activity']} {deal['Company']} "
+                      f"({deal['Industry']}) [listed by {', '.join(deal['Sources'])}]")
+            print(f"{len(deals)} deals in {elapsed * 1000:.1f} ms")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
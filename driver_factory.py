@@ -0,0 +1,107 @@
+# Chrome driver factory.
+#
+# - chromedriver is resolved once (CHROMEDRIVER_PATH, then the path cached in
+#   .chromedriver_path, then webdriver_manager) instead of a network check on
+#   every start
+# - a persistent user-data dir keeps Chrome's HTTP cache and cookies between
+#   runs
+# - images, fonts and third-party trackers are blocked
+# - startup time is measured, and with measure_bytes the bytes transferred per
+#   page too, from Chrome's performance log (off by default: the log records
+#   every network event and grows until it is read)
+import json
+import os
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support.ui import WebDriverWait
+
+from instrumentation import instrument_driver, metrics
+
+CHROMEDRIVER_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".chromedriver_path")
+DEFAULT_PROFILE_DIR = "chrome_profile"
+
+BLOCKED_URL_PATTERNS = [
+    # Fonts
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+    # Images the scraper never looks at
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    # Analytics and trackers
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*facebook.net*",
+    "*hotjar.com*", "*segment.io*", "*segment.com*", "*intercom.io*", "*hubspot.com*", "*linkedin.com/px*",
+    "*bat.bing.com*", "*newrelic.com*", "*nr-data.net*", "*sentry.io*", "*fullstory.com*",
+]
+
+
+def resolve_chromedriver():
+    path = os.environ.get("CHROMEDRIVER_PATH")
+    if path:
+        return path
+    if os.path.exists(CHROMEDRIVER_CACHE):
+        with open(CHROMEDRIVER_CACHE, encoding="utf-8") as f:
+            path = f.read().strip()
+        if path and os.path.isfile(path):
+            return path
+    # Only the first run (or a run after the cached binary disappeared) pays for this
+    from webdriver_manager.chrome import ChromeDriverManager
+    path = ChromeDriverManager().install()
+    with open(CHROMEDRIVER_CACHE, "w", encoding="utf-8") as f:
+        f.write(path)
+    return path
+
+
+def chrome_options(headless=False, profile_dir=None, block_assets=True, measure_bytes=False):
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+    if profile_dir:
+        options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
+    if block_assets:
+        options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-background-networking")
+    if measure_bytes:
+        # Network events for bytes_transferred; the caller must drain the log after every page
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def create_driver(headless=False, profile_dir=None, block_assets=True, measure_bytes=False):
+    # Returns (driver, wait); driver.startup_seconds says how long Chrome took to come up
+    started = time.perf_counter()
+    service = Service(resolve_chromedriver())
+    options = chrome_options(headless, profile_dir, block_assets, measure_bytes)
+    driver = webdriver.Chrome(service=service, options=options)
+    if block_assets:
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        except Exception as e:
+            print(f"Warning: could not block assets over CDP: {e}")
+    driver.startup_seconds = time.perf_counter() - started
+    metrics.observe('driver_start', driver.startup_seconds)
+    instrument_driver(driver) # Count WebDriver commands per firm
+    wait = WebDriverWait(driver, 10) # Initialize WebDriverWait for explicit waits
+    return driver, wait
+
+
+def bytes_transferred(driver):
+    # Bytes received since the last call, from the performance log (which
+    # this call drains); None unless the driver was made with measure_bytes
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return None
+    total = 0
+    for entry in entries:
+        if "Network.loadingFinished" not in entry.get("message", ""):
+            continue
+        event = json.loads(entry["message"]).get("message", {})
+        if event.get("method") == "Network.loadingFinished":
+            total += int(event.get("params", {}).get("encodedDataLength", 0))
+    return total
@@ -0,0 +1,343 @@
+# Lightweight fetch backend: download the profile HTML over a pooled HTTP
+# session and parse Overview, Location, website link and tombstones without
+# starting Chrome. When the pagination control links to its pages, the other
+# transaction pages are downloaded the same way, several at once. Returns None
+# whenever the page does not contain enough to produce the same record as the
+# Selenium path, so the caller can fall back.
+#
+# Try it against the saved fixture pages:
+#   python mock_axial_server.py --port 8765
+#   python http_backend.py http://127.0.0.1:8765/company/baymark-partners
+import sys
+import time
+from html.parser import HTMLParser
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import pagination
+import rate_limiter
+from instrumentation import metrics
+from page_cache import content_hash
+from page_readiness import OVERVIEW_HEADING_TAGS
+from page_text import PageTextIndex
+from tombstones import error_transaction
+from transaction_history import take_until_known
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/126.0 Safari/537.36")
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+SKIP_TEXT_TAGS = {"script", "style", "noscript", "template"}
+BLOCK_TAGS = {"address", "article", "aside", "blockquote", "div", "dl", "dt", "dd", "footer", "form",
+              "h1", "h2", "h3", "h4", "h5", "h6", "header", "li", "main", "nav", "ol", "p", "section",
+              "table", "tr", "ul", "br", "axl-legacy-tombstone"}
+HEADING_TAGS = set(OVERVIEW_HEADING_TAGS)
+
+
+def create_session(pool_size=10):
+    # One session per process/worker; connections to axial.net are reused
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"})
+    return session
+
+
+class Node(object):
+    def __init__(self, tag, attrs, parent=None):
+        self.tag = tag
+        self.attrs = dict(attrs)
+        self.parent = parent
+        self.children = [] # Node or str
+
+    @property
+    def classes(self):
+        return (self.attrs.get("class") or "").split()
+
+    def iter(self):
+        # A <template> is inert until script clones it, so its contents are
+        # not part of the page (hidden tombstones, later pages)
+        yield self
+        if self.tag == "template":
+            return
+        for child in self.children:
+            if isinstance(child, Node):
+                yield from child.iter()
+
+    def find_all(self, predicate):
+        return [node for node in self.iter() if node is not self and predicate(node)]
+
+    def find(self, predicate):
+        for node in self.iter():
+            if node is not self and predicate(node):
+                return node
+        return None
+
+    def element_children(self):
+        return [child for child in self.children if isinstance(child, Node)]
+
+    def next_sibling(self):
+        if self.parent is None:
+            return None
+        siblings = self.parent.element_children()
+        index = siblings.index(self)
+        return siblings[index + 1] if index + 1 < len(siblings) else None
+
+    def raw_text(self):
+        parts = []
+        self._collect_text(parts)
+        return "".join(parts)
+
+    def _collect_text(self, parts):
+        if self.tag in SKIP_TEXT_TAGS:
+            return
+        if self.tag in BLOCK_TAGS:
+            parts.append("\n")
+        for child in self.children:
+            if isinstance(child, Node):
+                child._collect_text(parts)
+            else:
+                parts.append(child)
+        if self.tag in BLOCK_TAGS:
+            parts.append("\n")
+
+    @property
+    def text(self):
+        # Close to WebElement.text: whitespace collapsed within a line, block
+        # elements on their own lines, no blank lines
+        lines = (" ".join(line.split()) for line in self.raw_text().split("\n"))
+        return "\n".join(line for line in lines if line)
+
+
+class TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#document", [])
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, attrs, self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.children.append(Node(tag, attrs, self.current))
+
+    def handle_endtag(self, tag):
+        # Close up to the matching open tag; ignore stray end tags
+        node = self.current
+        while node is not None and node.tag != tag:
+            node = node.parent
+        if node is not None and node.parent is not None:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+
+def parse_html(html):
+    builder = TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+def has_class(*names):
+    return lambda node: all(name in node.classes for name in names)
+
+
+def parse_tombstone(tombstone):
+    parties = tombstone.find_all(has_class("tombstone-party"))
+    activity_elem = tombstone.find(has_class("tombstone-activity"))
+    footer_div = tombstone.find(has_class("footer"))
+    footer_spans = footer_div.find_all(lambda n: n.tag == "span" and "u-text-xs-01" in n.classes
+                                       and "u-text-color-secondary" in n.classes) if footer_div else []
+    if activity_elem is None or footer_div is None:
+        # Same placeholder the Selenium path writes when a tombstone is incomplete
+        return error_transaction()
+    return {
+        'Acquirer/Investor': parties[0].text if len(parties) > 0 else "N/A",
+        'Activity': activity_elem.text,
+        'Company': parties[1].text if len(parties) > 1 else "N/A",
+        'Industry': footer_spans[0].text if len(footer_spans) > 0 else "N/A",
+        'Date': footer_spans[1].text if len(footer_spans) > 1 else "N/A",
+    }
+
+
+def is_next_button(button):
+    # The three branches of NEXT_BUTTON_XPATH
+    label = button.attrs.get("aria-label") or ""
+    if "Next page" in label or "pagination-next" in (button.attrs.get("class") or ""):
+        return True
+    if any(child.tag == "svg" and "arrow-right" in (child.attrs.get("data-icon") or "")
+           for child in button.element_children()):
+        return True
+    return ">" in button.raw_text() and "disabled" not in button.attrs
+
+
+def has_more_pages(root):
+    # Same button the Selenium path clicks (the first one NEXT_BUTTON_XPATH
+    # matches, enabled); we cannot click it over HTTP
+    button = root.find(lambda n: n.tag == "button" and is_next_button(n))
+    if button is None:
+        return False
+    return "disabled" not in button.attrs and "disabled" not in button.classes
+
+
+def page_controls(root):
+    # (label, href) of the links and buttons in the pagination control, and its text
+    controls = []
+    text = []
+    for container in root.find_all(lambda n: "pagination" in (n.attrs.get("class") or "")):
+        text.append(container.text)
+        for node in [container] + container.find_all(lambda n: n.tag in ("a", "button")):
+            if node.tag in ("a", "button"):
+                controls.append((node.text, node.attrs.get("href")))
+    return controls, "\n".join(text)
+
+
+def parse_tombstone_page(html, url):
+    # (transactions, PageInfo or None on the last page) of one transactions page
+    body = parse_html(html)
+    transactions = [parse_tombstone(t) for t in body.find_all(lambda n: n.tag == "axl-legacy-tombstone")]
+    if not has_more_pages(body):
+        return transactions, None
+    return transactions, pagination.page_info(url, *page_controls(body))
+
+
+def fetch_tombstone_page(session, url, timeout=15, limiter=None):
+    # One of a firm's later transaction pages. The firm already holds a limiter
+    # slot for its profile, so this only waits for a token.
+    if limiter is not None:
+        limiter.acquire(url, slot=False)
+    outcome, latency, retry_after = rate_limiter.ERROR, None, None
+    try:
+        started = time.perf_counter()
+        try:
+            response = session.get(url, timeout=timeout)
+        except requests.RequestException as e:
+            print(f"HTTP fetch failed for {url}: {e}")
+            return None
+        latency = time.perf_counter() - started
+        metrics.observe('http_fetch', latency)
+        metrics.count('pages')
+        if response.status_code == 429:
+            outcome = rate_limiter.THROTTLED
+            retry_after = rate_limiter.parse_retry_after(response.headers.get("Retry-After"))
+            return None
+        if response.status_code != 200:
+            return None
+        page = parse_tombstone_page(response.text, url)
+        outcome = rate_limiter.OK if page[0] else rate_limiter.EMPTY
+        return page
+    finally:
+        if limiter is not None:
+            limiter.release(url, outcome, latency, retry_after, slot=False)
+
+
+def parse_profile(html, title, known_fingerprints=None, url=None, fetch_page=None):
+    # fetch_page(url) reads one later transactions page (see fetch_tombstone_page);
+    # without it a paginated profile is left to the browser
+    root = parse_html(html)
+    body = root.find(lambda n: n.tag == "body") or root
+    page_index = PageTextIndex(body.text)
+
+    # --- Overview ---
+    overview_text = None
+    heading = body.find(lambda n: n.tag in HEADING_TAGS and "Overview" in n.text)
+    if heading is not None and heading.next_sibling() is not None:
+        description = heading.next_sibling()
+        # A truncated description is only completed by clicking "Show full description"
+        if description.find(lambda n: "more-label" in n.attrs) is not None:
+            return None
+        overview_text = description.text
+    if not overview_text or overview_text.strip() == "":
+        overview_text = page_index.extract_section(["Overview", "About Us", "Company Profile"])
+
+    # --- Tombstones ---
+    tombstones = body.find_all(lambda n: n.tag == "axl-legacy-tombstone")
+
+    # A client-rendered shell has neither; let the browser handle it
+    if (not overview_text or overview_text.strip() == "") and not tombstones:
+        return None
+
+    transactions = [parse_tombstone(tombstone) for tombstone in tombstones]
+    reached_known = False
+    if known_fingerprints:
+        transactions, reached_known = take_until_known(transactions, known_fingerprints)
+    # Later pages only matter if everything on this one is new
+    if not reached_known and has_more_pages(body):
+        info = pagination.page_info(url, *page_controls(body)) if url is not None else None
+        if fetch_page is None or info is None or not info.direct:
+            return None # Only reachable by clicking
+        transactions = pagination.collect_pages(info, transactions, fetch_page, known_fingerprints)
+        if transactions is None:
+            print(f"Transaction pages of {url} did not advance over HTTP")
+            return None
+
+    location_text = page_index.extract_section(["Location", "Address", "Contact"])
+    link_elem = body.find(lambda n: n.tag == "a" and "u-link" in n.classes)
+
+    return {
+        'Title': title,
+        'Overview': overview_text if overview_text and overview_text.strip() else "Overview not found",
+        'Location': location_text if location_text and location_text.strip() else "Location not found",
+        'URL': (link_elem.attrs.get("href") if link_elem is not None else None) or "URL not found in a.u-link",
+        'Transactions': transactions,
+    }
+
+
+def fetch_company(session, url, title, known_fingerprints=None, timeout=15, limiter=None, page_cache=None):
+    # With a DomainLimiter the request waits for a slot and reports how the
+    # response went, so every worker backs off together. With a PageCache an
+    # unchanged page (same raw HTML) returns the cached record without parsing.
+    if limiter is not None:
+        limiter.acquire(url)
+    outcome, latency, retry_after = rate_limiter.ERROR, None, None
+    try:
+        started = time.perf_counter()
+        try:
+            response = session.get(url, timeout=timeout)
+        except requests.RequestException as e:
+            print(f"HTTP fetch failed for {url}: {e}")
+            return None
+        latency = time.perf_counter() - started
+        metrics.observe('http_fetch', latency)
+        metrics.count('pages')
+        if response.status_code == 429:
+            outcome = rate_limiter.THROTTLED
+            retry_after = rate_limiter.parse_retry_after(response.headers.get("Retry-After"))
+            print(f"Throttled by {url} (429), backing off")
+            return None
+        if response.status_code >= 500:
+            return None
+        outcome = rate_limiter.OK
+        if response.status_code != 200 or "html" not in response.headers.get("Content-Type", "html"):
+            return None
+        if page_cache is not None:
+            cached = page_cache.lookup(url, content_hash(response.text, "html"))
+            if cached is not None:
+                return cached
+        with metrics.timer('http_parse'):
+            record = parse_profile(response.text, title, known_fingerprints, url,
+                                   lambda page_url: fetch_tombstone_page(session, page_url, timeout, limiter))
+        if record is not None:
+            outcome = rate_limiter.record_outcome(record, bool(known_fingerprints))
+        return record
+    finally:
+        if limiter is not None:
+            limiter.release(url, outcome, latency, retry_after)
+
+
+if __name__ == "__main__":
+    for url in sys.argv[1:]:
+        record = fetch_company(create_session(), url, url.rstrip('/').split('/')[-1])
+        if record is None:
+            print(f"✗ {url}: lightweight parse failed, would fall back to Selenium")
+        else:
+            print(f"✓ {url}: {len(record['Transactions'])} transactions")
+            for key in ('Title', 'Overview', 'Location', 'URL'):
+                print(f"  {key}: {record[key]}")
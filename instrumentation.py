@@ -0,0 +1,252 @@
+# Per-stage timers and counters for the scrapers.
+#
+# Everything records into the process-wide `metrics` object:
+#
+#   with metrics.firm(title):          # attributes the stages below to one firm
+#       lap = metrics.stopwatch()
+#       ...; lap('page_load')          # seconds since the previous lap
+#       with metrics.timer('write'):   # or time a block
+#           ...
+#       metrics.count('retries')
+#
+# Stages named "wait.<signal>" are time spent waiting on the page (recorded by
+# PageReadiness); everything else in a firm counts as work. WebDriver commands
+# are counted by wrapping driver.execute (see instrument_driver), which every
+# Selenium call, WebElement methods included, goes through.
+#
+# At the end of a run print_summary() shows where the time went;
+# write_json() saves the same numbers (plus per-firm detail for the most
+# recent MAX_FIRMS firms, so long runs do not grow without bound) and serve()
+# exposes them as Prometheus text at http://127.0.0.1:<port>/metrics.
+import contextvars
+import json
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Durations kept per stage for percentiles
+MAX_SAMPLES = 10000
+
+# Firms kept with per-firm detail; older ones only count towards the totals
+MAX_FIRMS = 1000
+
+WAIT_PREFIX = "wait."
+
+current_firm = contextvars.ContextVar("current_firm", default=None)
+
+
+def percentile(values, q):
+    # Nearest-rank percentile of an unsorted sequence, or None if empty
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100.0 * len(ordered)) - 1))]
+
+
+class Metrics(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.stages = {}   # stage -> {'count', 'seconds', 'max', 'samples'}
+        self.counters = {} # name -> total
+        self.firms = OrderedDict() # title -> {'seconds', 'stages': {stage: seconds}, 'counters': {name: total}}
+        self.firms_dropped = 0
+
+    def reset(self):
+        with self.lock:
+            self.started = time.perf_counter()
+            self.stages = {}
+            self.counters = {}
+            self.firms = OrderedDict()
+            self.firms_dropped = 0
+
+    def firm_entry(self, title):
+        # Caller holds the lock. The least recently used firm is dropped past MAX_FIRMS.
+        if title in self.firms:
+            self.firms.move_to_end(title)
+            return self.firms[title]
+        entry = self.firms[title] = {'seconds': 0.0, 'stages': {}, 'counters': {}}
+        while len(self.firms) > MAX_FIRMS:
+            self.firms.popitem(last=False)
+            self.firms_dropped += 1
+        return entry
+
+    def observe(self, stage, seconds):
+        title = current_firm.get()
+        with self.lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = {'count': 0, 'seconds': 0.0, 'max': 0.0,
+                                              'samples': deque(maxlen=MAX_SAMPLES)}
+            entry['count'] += 1
+            entry['seconds'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            entry['samples'].append(seconds)
+            if title is not None:
+                firm_stages = self.firm_entry(title)['stages']
+                firm_stages[stage] = firm_stages.get(stage, 0.0) + seconds
+
+    def count(self, name, n=1):
+        title = current_firm.get()
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+            if title is not None:
+                firm_counters = self.firm_entry(title)['counters']
+                firm_counters[name] = firm_counters.get(name, 0) + n
+
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def stopwatch(self):
+        # Returns lap(stage): records the time since the previous lap (or since
+        # the stopwatch was made) under stage
+        last = [time.perf_counter()]
+
+        def lap(stage):
+            now = time.perf_counter()
+            self.observe(stage, now - last[0])
+            last[0] = now
+        return lap
+
+    @contextmanager
+    def firm(self, title):
+        token = current_firm.set(title)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            current_firm.reset(token)
+            with self.lock:
+                self.firm_entry(title)['seconds'] += seconds
+            self.observe('firm', seconds)
+            self.count('firms')
+
+    def snapshot(self, include_firms=False):
+        with self.lock:
+            elapsed = time.perf_counter() - self.started
+            stages = {}
+            for stage, entry in self.stages.items():
+                samples = list(entry['samples'])
+                stages[stage] = {
+                    'count': entry['count'],
+                    'seconds': entry['seconds'],
+                    'avg': entry['seconds'] / entry['count'],
+                    'max': entry['max'],
+                    'p50': percentile(samples, 50),
+                    'p95': percentile(samples, 95),
+                }
+            counters = dict(self.counters)
+            firms = {title: {'seconds': firm['seconds'], 'stages': dict(firm['stages']),
+                             'counters': dict(firm['counters'])}
+                     for title, firm in self.firms.items()} if include_firms else None
+            firms_dropped = self.firms_dropped
+
+        firm_count = counters.get('firms', 0)
+        firm_seconds = stages.get('firm', {}).get('seconds', 0.0)
+        wait_seconds = sum(entry['seconds'] for stage, entry in stages.items() if stage.startswith(WAIT_PREFIX))
+        snapshot = {
+            'elapsed_seconds': elapsed,
+            'stages': stages,
+            'counters': counters,
+            'derived': {
+                'firms_per_minute': firm_count / elapsed * 60 if elapsed else 0.0,
+                'pages_per_second': counters.get('pages', 0) / elapsed if elapsed else 0.0,
+                'webdriver_commands_per_firm': counters.get('webdriver_commands', 0) / firm_count if firm_count else 0.0,
+                'wait_seconds': wait_seconds,
+                'work_seconds': max(0.0, firm_seconds - wait_seconds),
+            },
+        }
+        if firms is not None:
+            snapshot['firms'] = firms
+            snapshot['firms_dropped'] = firms_dropped
+        return snapshot
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(include_firms=True), f, indent=2)
+
+    def prometheus_text(self):
+        snapshot = self.snapshot()
+        lines = [
+            "# TYPE scraper_stage_seconds summary",
+        ]
+        for stage, entry in sorted(snapshot['stages'].items()):
+            for q in (50, 95):
+                lines.append(f'scraper_stage_seconds{{stage="{stage}",quantile="{q / 100:g}"}} {entry[f"p{q}"]:.6f}')
+            lines.append(f'scraper_stage_seconds_sum{{stage="{stage}"}} {entry["seconds"]:.6f}')
+            lines.append(f'scraper_stage_seconds_count{{stage="{stage}"}} {entry["count"]}')
+        lines.append("# TYPE scraper_events_total counter")
+        for name, total in sorted(snapshot['counters'].items()):
+            lines.append(f'scraper_events_total{{name="{name}"}} {total}')
+        lines.append("# TYPE scraper_derived gauge")
+        for name, value in sorted(snapshot['derived'].items()):
+            lines.append(f'scraper_derived{{name="{name}"}} {value:.6f}')
+        lines.append("# TYPE scraper_uptime_seconds gauge")
+        lines.append(f"scraper_uptime_seconds {snapshot['elapsed_seconds']:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9108):
+        # Prometheus-style endpoint in a background thread; returns the server
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ("", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"Metrics at http://127.0.0.1:{server.server_address[1]}/metrics")
+        return server
+
+    def print_summary(self):
+        snapshot = self.snapshot()
+        if not snapshot['stages'] and not snapshot['counters']:
+            return
+        print(f"\n=== METRICS ===")
+        for stage, entry in sorted(snapshot['stages'].items(), key=lambda item: -item[1]['seconds']):
+            print(f"{stage}: {entry['count']} x, {entry['seconds']:.2f}s total, {entry['avg'] * 1000:.0f} ms avg, "
+                  f"p95 {entry['p95'] * 1000:.0f} ms, max {entry['max'] * 1000:.0f} ms")
+        if snapshot['counters']:
+            print(", ".join(f"{name}: {total}" for name, total in sorted(snapshot['counters'].items())))
+        derived = snapshot['derived']
+        print(f"{derived['firms_per_minute']:.1f} firms/min, {derived['pages_per_second']:.2f} pages/s, "
+              f"{derived['webdriver_commands_per_firm']:.0f} WebDriver commands/firm, "
+              f"{derived['wait_seconds']:.1f}s waiting vs {derived['work_seconds']:.1f}s working")
+
+
+metrics = Metrics()
+
+
+def instrument_driver(driver):
+    # Count every WebDriver command against the current firm
+    if getattr(driver, "instrumented", False):
+        return driver
+    original = driver.execute
+
+    def execute(*args, **kwargs):
+        metrics.count('webdriver_commands')
+        return original(*args, **kwargs)
+
+    driver.execute = execute
+    driver.instrumented = True
+    return driver
@@ -0,0 +1,194 @@
+# Persistent job ledger for resumable crawls.
+#
+# One row per firm, keyed by the URL slug, recording status, attempt count,
+# timestamps and a hash of the scraped record. A restarted run skips firms
+# that are done, retries failed ones after an exponential backoff and only
+# hands out the remaining work. Safe to share between worker threads.
+#
+# Only the firms this run registered with sync() are handed out, so --limit
+# and --shard hold even when the file has leftovers from other runs, and
+# several processes can share one ledger: each claim is a single write
+# transaction, so no two processes get the same firm.
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"     # will be retried once its backoff has passed
+GAVE_UP = "gave_up"   # failed max_attempts times
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    slug TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    content_hash TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    claimed_by TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, next_attempt_at);
+CREATE TEMP TABLE IF NOT EXISTS run_jobs (slug TEXT PRIMARY KEY);
+"""
+
+# The firms registered by this connection's sync()
+IN_RUN = "slug IN (SELECT slug FROM temp.run_jobs)"
+
+
+def url_slug(url):
+    # Same naming the per-firm output files use
+    return url.rstrip('/').split('/')[-1]
+
+
+def record_hash(record):
+    payload = json.dumps(record, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def process_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def is_running(claimed_by):
+    # False if the process that claimed a job is gone. Jobs claimed on another
+    # host, or before claims were recorded, cannot be checked and count as gone.
+    host, _, pid = (claimed_by or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobLedger(object):
+    def __init__(self, path="scrape_ledger.db", max_attempts=4, base_backoff=30, max_backoff=900):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lock = threading.Lock()
+        # Other processes may hold the write lock while they claim a firm
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")]
+        if "claimed_by" not in columns: # Ledger written before claims were recorded
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN claimed_by TEXT")
+        self.claimant = process_id()
+
+    def sync(self, rows):
+        # Register the firms of this run; existing entries keep their status and history
+        now = utc_now()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for row in rows:
+                    slug = url_slug(row['url'])
+                    self.conn.execute(
+                        "INSERT OR IGNORE INTO jobs (slug, url, title, created_at) VALUES (?, ?, ?, ?)",
+                        (slug, row['url'], row['Title'], now))
+                    self.conn.execute("INSERT OR IGNORE INTO temp.run_jobs VALUES (?)", (slug,))
+                # Our firms left running by a crashed run count as interrupted,
+                # not done; those claimed by a live process are left alone
+                stale = [(PENDING, slug) for slug, claimed_by in self.conn.execute(
+                    f"SELECT slug, claimed_by FROM jobs WHERE status = ? AND {IN_RUN}", (RUNNING,)).fetchall()
+                    if not is_running(claimed_by)]
+                self.conn.executemany("UPDATE jobs SET status = ? WHERE slug = ?", stale)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def requeue_all(self):
+        # Start a new pass over every firm of this run, e.g. for a scheduled refresh
+        with self.lock:
+            self.conn.execute(f"UPDATE jobs SET status = ?, attempts = 0, next_attempt_at = 0 WHERE {IN_RUN}",
+                              (PENDING,))
+
+    def claim_next(self):
+        # Returns the next firm that is ready to run as {'Title', 'url', 'slug', 'attempts'}, or None
+        with self.lock:
+            # The write lock is taken before reading, so another process
+            # cannot pick the same row between the SELECT and the UPDATE
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                found = self.conn.execute(
+                    f"SELECT slug, url, title, attempts FROM jobs WHERE status IN (?, ?) AND next_attempt_at <= ? "
+                    f"AND {IN_RUN} ORDER BY attempts, rowid LIMIT 1", (PENDING, FAILED, time.time())).fetchone()
+                if found is not None:
+                    self.conn.execute("UPDATE jobs SET status = ?, started_at = ?, claimed_by = ? WHERE slug = ?",
+                                      (RUNNING, utc_now(), self.claimant, found[0]))
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+        if found is None:
+            return None
+        slug, url, title, attempts = found
+        return {'Title': title, 'url': url, 'slug': slug, 'attempts': attempts}
+
+    def mark_done(self, slug, content_hash=None):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, content_hash = ?, finished_at = ?, "
+                "last_error = NULL WHERE slug = ?", (DONE, content_hash, utc_now(), slug))
+
+    def mark_failed(self, slug, error):
+        # Returns True if the firm will be retried, False if we gave up on it
+        with self.lock:
+            attempts = self.conn.execute("SELECT attempts FROM jobs WHERE slug = ?", (slug,)).fetchone()[0] + 1
+            retry = attempts < self.max_attempts
+            backoff = min(self.base_backoff * 2 ** (attempts - 1), self.max_backoff)
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, last_error = ?, finished_at = ?, next_attempt_at = ? "
+                "WHERE slug = ?", (FAILED if retry else GAVE_UP, attempts, str(error), utc_now(),
+                                   time.time() + backoff, slug))
+        return retry
+
+    def seconds_until_next_retry(self):
+        # None when nothing is left to retry
+        with self.lock:
+            found = self.conn.execute(
+                f"SELECT MIN(next_attempt_at) FROM jobs WHERE status IN (?, ?) AND {IN_RUN}",
+                (PENDING, FAILED)).fetchone()[0]
+        if found is None:
+            return None
+        return max(0.0, found - time.time())
+
+    def has_completed(self):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM jobs WHERE status = ? LIMIT 1", (DONE,)).fetchone() is not None
+
+    def counts(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def print_summary(self):
+        counts = self.counts()
+        print(f"\n=== JOB LEDGER ({self.path}) ===")
+        for status in (DONE, FAILED, GAVE_UP, PENDING, RUNNING):
+            if counts.get(status):
+                print(f"{status}: {counts[status]}")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,176 @@
+# Single-pass parser for the legacy text output: scraped_data.txt from
+# scraper.py and the per-firm .txt files in scraped_company_data/ from
+# initial-scraper-code.py.
+#
+# Records come back in the same shape the scrapers produce ('Title',
+# 'Overview', 'Location', 'URL', 'Transactions'); per-firm error files
+# ("Title:/URL:/Error:") get an 'Error' key and Transactions set to "Error".
+# Files are read line by line and directories a bounded number of files at a
+# time, so nothing ever holds a whole archive in memory.
+#
+#   python legacy_parser.py scraped_data.txt
+#   python legacy_parser.py scraped_company_data/ --workers 8
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+HEADER_FIELDS = {"Title", "Overview", "Location", "URL", "Error"}
+TRANSACTION_KEYS = {"Acquirer/Investor", "Activity", "Company", "Industry", "Date"}
+TRANSACTIONS_MARKER = "--- Transactions ---"
+NO_TRANSACTIONS = "No transactions found."
+
+
+def finish(record):
+    if 'Error' in record and record['Transactions'] is None:
+        record['Transactions'] = "Error"
+    elif record['Transactions'] is None:
+        record['Transactions'] = []
+    for field in ('Overview', 'Location', 'URL'):
+        record.setdefault(field, "N/A")
+    return record
+
+
+def iter_records(lines):
+    # Streams records out of any iterable of lines (an open file works)
+    record = None
+    last_field = None     # header field that continuation lines belong to
+    in_transactions = False
+    transaction = None
+
+    for raw_line in lines:
+        line = raw_line.rstrip("\r\n")
+        if not line:
+            continue
+
+        if line.startswith("Title: "):
+            if record is not None:
+                yield finish(record)
+            record = {'Title': line[7:], 'Transactions': None}
+            last_field = 'Title'
+            in_transactions = False
+            transaction = None
+            continue
+        if record is None:
+            continue # Junk before the first record
+
+        if in_transactions:
+            if line.startswith("    "):
+                key, sep, value = line[4:].partition(": ")
+                if transaction is None:
+                    continue
+                if sep and key in TRANSACTION_KEYS:
+                    transaction[key] = value
+                    last_field = key
+                elif last_field is not None:
+                    transaction[last_field] += "\n" + line.strip()
+            elif line.startswith("  Transaction ") and line.endswith(":"):
+                transaction = {}
+                record['Transactions'].append(transaction)
+                last_field = None
+            elif line.startswith("  "):
+                text = line.strip()
+                if text != NO_TRANSACTIONS:
+                    record['Transactions'] = text # Error string instead of a list
+            elif transaction is not None and last_field is not None:
+                # Value that had a newline in it when it was written
+                transaction[last_field] += "\n" + line
+            continue
+
+        if line == TRANSACTIONS_MARKER:
+            in_transactions = True
+            record['Transactions'] = []
+            last_field = None
+            continue
+
+        field, sep, value = line.partition(": ")
+        if sep and field in HEADER_FIELDS:
+            record[field] = value
+            last_field = field
+        elif line.endswith(":") and line[:-1] in HEADER_FIELDS:
+            record[line[:-1]] = ""
+            last_field = line[:-1]
+        elif last_field is not None:
+            # Overview text spanning several lines
+            record[last_field] += "\n" + line
+
+    if record is not None:
+        yield finish(record)
+
+
+def parse_file(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return list(iter_records(f))
+
+
+def iter_file(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        yield from iter_records(f)
+
+
+def iter_directory(directory, workers=8, suffix=".txt"):
+    # Per-firm files are small, so each worker parses a whole file; at most
+    # 2 * workers files are in flight at once and results keep file order
+    paths = (entry.path for entry in sorted(os.scandir(directory), key=lambda e: e.name)
+             if entry.is_file() and entry.name.endswith(suffix))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for path in paths:
+            pending.append(executor.submit(parse_file, path))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def iter_archive(path, workers=8):
+    if os.path.isdir(path):
+        return iter_directory(path, workers)
+    return iter_file(path)
+
+
+def iter_transaction_rows(records):
+    # Flat rows, one per transaction, tagged with the firm they came from
+    for record in records:
+        if not isinstance(record['Transactions'], list):
+            continue
+        for position, transaction in enumerate(record['Transactions']):
+            yield {
+                'Firm': record['Title'],
+                'Position': position,
+                'Acquirer/Investor': transaction.get('Acquirer/Investor', 'N/A'),
+                'Activity': transaction.get('Activity', 'N/A'),
+                'Company': transaction.get('Company', 'N/A'),
+                'Industry': transaction.get('Industry', 'N/A'),
+                'Date': transaction.get('Date', 'N/A'),
+            }
+
+
+def load_firms(path, workers=8):
+    # One row per firm; the transactions stay nested
+    return pd.DataFrame.from_records(iter_archive(path, workers))
+
+
+def load_transactions(path, workers=8):
+    # One row per transaction
+    return pd.DataFrame.from_records(iter_transaction_rows(iter_archive(path, workers)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse legacy scraped_data.txt / per-firm .txt archives")
+    parser.add_argument("path", help="scraped_data.txt or a directory of per-firm .txt files")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    firms = 0
+    transactions = 0
+    errors = 0
+    for record in iter_archive(args.path, args.workers):
+        firms += 1
+        if isinstance(record['Transactions'], list):
+            transactions += len(record['Transactions'])
+        else:
+            errors += 1
+    print(f"{firms} firms, {transactions} transactions, {errors} firms with errors")
@@ -0,0 +1,160 @@
+# Fast loading of the firms to scrape.
+#
+# Parsing "Master PE List.xlsx" with openpyxl dominates startup on a large
+# workbook, so the Title/url columns are converted once into a Parquet
+# snapshot next to it (input_snapshot/). The snapshot is reused while the
+# workbook's size and mtime are unchanged; if only the mtime moved, a SHA-256
+# of the workbook decides. When create-url.py has written a
+# master_pe_urls.parquet from the current workbook (same check, against the
+# master_pe_urls.meta.json it writes next to it), that file is read instead
+# (it is already deduplicated).
+#
+# Snapshots are written in small row groups, so a shard (a row range) only
+# reads the row groups it overlaps instead of the whole sheet:
+#
+#   load_valid_urls()                    # every firm with a url
+#   load_valid_urls(shard=(2, 8))        # the third of eight equal shards
+#   load_valid_urls(start=500, stop=1000)
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # Without pyarrow every run reads the workbook
+    pa = None
+    pq = None
+
+MASTER_LIST = "Master PE List.xlsx"
+URLS_PATH = "master_pe_urls.parquet"
+SNAPSHOT_DIR = "input_snapshot"
+COLUMNS = ['Title', 'url']
+ROW_GROUP_SIZE = 1000
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def snapshot_paths(path, snapshot_dir=SNAPSHOT_DIR):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return (os.path.join(snapshot_dir, f"{name}.parquet"),
+            os.path.join(snapshot_dir, f"{name}.meta.json"))
+
+
+def meta_path_for(data_path):
+    return os.path.splitext(data_path)[0] + ".meta.json"
+
+
+def snapshot_is_current(path, data_path, meta_path):
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return False
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    stat = os.stat(path)
+    if meta.get('size') != stat.st_size:
+        return False
+    if meta.get('mtime') == stat.st_mtime:
+        return True
+    # Touched but maybe not changed (copied, re-saved): compare contents
+    if meta.get('sha256') != file_sha256(path):
+        return False
+    meta['mtime'] = stat.st_mtime
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return True
+
+
+def build_snapshot(path, data_path, meta_path):
+    print(f"Converting {path} to {data_path} (only needed when the workbook changes)")
+    df = pd.read_excel(path, usecols=lambda column: column in COLUMNS)
+    df = df[df['url'].notna()].reset_index(drop=True)
+    os.makedirs(os.path.dirname(data_path) or ".", exist_ok=True)
+    table = pa.Table.from_pandas(df[COLUMNS], preserve_index=False)
+    pq.write_table(table, data_path, row_group_size=ROW_GROUP_SIZE)
+    write_meta(path, meta_path, len(df))
+
+
+def write_meta(path, meta_path, rows):
+    # Records which version of the workbook a Parquet file was made from
+    stat = os.stat(path)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': file_sha256(path),
+                   'rows': rows}, f)
+
+
+def snapshot_for(path=MASTER_LIST, urls_path=URLS_PATH, snapshot_dir=SNAPSHOT_DIR):
+    # Parquet file holding Title/url for the workbook, (re)built if needed
+    if os.path.exists(urls_path):
+        if not os.path.exists(path):
+            return urls_path
+        urls_meta_path = meta_path_for(urls_path)
+        if os.path.exists(urls_meta_path):
+            if snapshot_is_current(path, urls_path, urls_meta_path):
+                return urls_path
+        elif os.path.getmtime(urls_path) >= os.path.getmtime(path): # Written before the meta file existed
+            return urls_path
+    data_path, meta_path = snapshot_paths(path, snapshot_dir)
+    if not snapshot_is_current(path, data_path, meta_path):
+        build_snapshot(path, data_path, meta_path)
+    return data_path
+
+
+def shard_range(num_rows, shard):
+    # (start, stop) of shard (index, count) when num_rows are split evenly
+    index, count = shard
+    if not 0 <= index < count:
+        raise ValueError(f"Shard index {index} out of range for {count} shards")
+    return num_rows * index // count, num_rows * (index + 1) // count
+
+
+def read_rows(data_path, start=0, stop=None):
+    # Rows [start, stop) of a Parquet file, reading only the row groups they overlap
+    parquet_file = pq.ParquetFile(data_path)
+    stop = parquet_file.metadata.num_rows if stop is None else min(stop, parquet_file.metadata.num_rows)
+    columns = [name for name in COLUMNS if name in parquet_file.schema_arrow.names]
+    tables = []
+    offset = 0
+    for group in range(parquet_file.num_row_groups):
+        group_rows = parquet_file.metadata.row_group(group).num_rows
+        if offset + group_rows > start and offset < stop:
+            table = parquet_file.read_row_group(group, columns=columns)
+            tables.append(table.slice(max(0, start - offset), min(group_rows, stop - offset) - max(0, start - offset)))
+        offset += group_rows
+        if offset >= stop:
+            break
+    if not tables:
+        return pd.DataFrame(columns=columns)
+    df = pa.concat_tables(tables).to_pandas()
+    df.index = range(start, start + len(df))
+    return df
+
+
+def load_valid_urls(path=MASTER_LIST, start=0, stop=None, shard=None):
+    # Title/url of every firm with a url (or of one row range / shard of them)
+    if pq is None:
+        df = pd.read_excel(path, usecols=lambda column: column in COLUMNS)
+        df = df[df['url'].notna()].reset_index(drop=True)
+        if shard is not None:
+            start, stop = shard_range(len(df), shard)
+        return df.iloc[start:stop]
+
+    data_path = snapshot_for(path)
+    if shard is not None:
+        start, stop = shard_range(pq.ParquetFile(data_path).metadata.num_rows, shard)
+    df = read_rows(data_path, start, stop)
+    # master_pe_urls.parquet keeps firms without a url
+    return df[df['url'].notna()]
+
+
+def parse_shard(value):
+    # "2/8" -> (1, 8): shards are numbered from 1 on the command line
+    index, count = (int(part) for part in value.split("/"))
+    return index - 1, count
@@ -0,0 +1,159 @@
+# Memory tracking for long unattended runs.
+#
+# After every firm the watchdog samples the resident memory of this Python
+# process and of the Chrome the driver started (chromedriver and every browser,
+# GPU and renderer process under it). LazyBrowser restarts Chrome between
+# firms once it grows past its limit. Python cannot be restarted in place:
+# when it stays above max_python_mb after a garbage collection, the run stops
+# cleanly and the job ledger lets the next run resume where this one stopped.
+# The summary shows peaks and how fast Python memory grew per 100 firms, which
+# is the first sign of a leak.
+#
+# psutil is used when installed; otherwise /proc is read (Linux only).
+import gc
+import os
+from collections import deque
+
+try:
+    import psutil
+except ImportError: # Falls back to /proc
+    psutil = None
+
+MB = 1024 * 1024
+
+# Python growth per 100 firms (after the first few firms warm up) worth a warning
+LEAK_WARN_MB = 20
+WARMUP_FIRMS = 20
+
+
+def rss_bytes(pid=None):
+    # Resident memory of one process, or None if it cannot be read
+    pid = os.getpid() if pid is None else pid
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii", errors="replace") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def child_pids(pid):
+    # Every process below pid
+    if psutil is not None:
+        try:
+            return [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+    if not os.path.isdir("/proc"):
+        return []
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="ascii", errors="replace") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces; the parent pid follows the state after ')'
+        parent = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(parent, []).append(int(entry))
+    found = []
+    pending = [pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            found.append(child)
+            pending.append(child)
+    return found
+
+
+def browser_rss_bytes(driver):
+    # chromedriver plus everything it started, or None if unknown
+    try:
+        pid = driver.service.process.pid
+    except AttributeError:
+        return None
+    sizes = [size for size in (rss_bytes(p) for p in [pid] + child_pids(pid)) if size is not None]
+    return sum(sizes) if sizes else None
+
+
+def growth_per_firm(samples):
+    # Least-squares slope of (firm number, MB) samples
+    if len(samples) < 2:
+        return 0.0
+    xs = [x for x, _ in samples]
+    ys = [y for _, y in samples]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    if not spread:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+
+
+class MemoryWatchdog(object):
+    def __init__(self, max_python_mb=None, leak_warn_mb=LEAK_WARN_MB, max_samples=2000):
+        self.max_python_mb = max_python_mb
+        self.leak_warn_mb = leak_warn_mb
+        self.firms = 0
+        self.python_samples = deque(maxlen=max_samples) # (firm number, MB)
+        self.peak_python_mb = 0.0
+        self.peak_browser_mb = 0.0
+        self.collections = 0
+        self.stop_reason = None
+
+    def python_mb(self):
+        size = rss_bytes()
+        return size / MB if size is not None else None
+
+    def after_firm(self, browser=None):
+        # Record memory after one firm. Returns None to carry on, or why the run should stop.
+        self.firms += 1
+        python_mb = self.python_mb()
+        if browser is not None and browser.rss_mb is not None:
+            self.peak_browser_mb = max(self.peak_browser_mb, browser.rss_mb)
+        if python_mb is None:
+            return None
+        self.peak_python_mb = max(self.peak_python_mb, python_mb)
+        if self.firms > WARMUP_FIRMS:
+            self.python_samples.append((self.firms, python_mb))
+
+        if self.max_python_mb and python_mb > self.max_python_mb:
+            gc.collect()
+            self.collections += 1
+            python_mb = self.python_mb() or python_mb
+            if python_mb > self.max_python_mb:
+                self.stop_reason = (f"Python at {python_mb:.0f} MB after {self.firms} firms "
+                                    f"(limit {self.max_python_mb} MB)")
+                return self.stop_reason
+        return None
+
+    def leak_mb_per_100_firms(self):
+        return growth_per_firm(self.python_samples) * 100
+
+    def print_summary(self, browser=None):
+        print(f"\n=== MEMORY ===")
+        python_mb = self.python_mb()
+        if python_mb is None:
+            print("Resident memory not available on this platform (install psutil)")
+            return
+        print(f"Python: {python_mb:.0f} MB now, {self.peak_python_mb:.0f} MB peak over {self.firms} firms"
+              + (f", {self.collections} forced collections" if self.collections else ""))
+        if self.peak_browser_mb:
+            print(f"Chrome: {self.peak_browser_mb:.0f} MB peak")
+        if browser is not None and browser.stats['recycles']:
+            reasons = ", ".join(f"{count} {reason}" for reason, count in sorted(browser.stats['recycles'].items()))
+            print(f"Chrome restarts: {reasons}")
+        if len(self.python_samples) >= 2:
+            growth = self.leak_mb_per_100_firms()
+            print(f"Python growth: {growth:+.1f} MB per 100 firms"
+                  + (" - possible leak" if growth > self.leak_warn_mb else ""))
+        if self.stop_reason:
+            print(f"Stopped early: {self.stop_reason}. Run again to resume from the job ledger.")
@@ -0,0 +1,132 @@
+# Local stand-in for network.axial.net that serves the saved profile pages in
+# fixtures/profiles/ at /company/<slug>, so the fetch backends can be tried
+# without hitting the live site. /company/<slug>?page=N serves
+# <slug>.page-N.html when that fixture exists; otherwise the parameter is
+# ignored and page 1 comes back, as on a site without server-side pages.
+#
+# It can also behave like a server under load: --latency adds a base response
+# time that grows with the number of requests in flight, and --max-rps answers
+# 429 Too Many Requests (with Retry-After) once the last second saw more than
+# that many requests.
+#
+#   python mock_axial_server.py --port 8765
+#   python mock_axial_server.py --port 8765 --latency 0.3 --max-rps 5
+#   -> http://127.0.0.1:8765/company/baymark-partners
+import argparse
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "profiles")
+
+
+class LoadModel(object):
+    # Shared by every handler thread of one server
+    def __init__(self, latency=0.0, max_rps=None, overload_latency=None):
+        self.latency = latency
+        # Extra seconds per request already in flight (defaults to the base latency)
+        self.overload_latency = latency if overload_latency is None else overload_latency
+        self.max_rps = max_rps
+        self.in_flight = 0
+        self.recent = deque()
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def enter(self):
+        # Returns None to serve the request, or the Retry-After seconds for a 429
+        with self.lock:
+            now = time.monotonic()
+            while self.recent and now - self.recent[0] > 1.0:
+                self.recent.popleft()
+            if self.max_rps is not None and len(self.recent) >= self.max_rps:
+                self.throttled += 1
+                return 1
+            self.recent.append(now)
+            self.in_flight += 1
+            return None
+
+    def delay(self):
+        with self.lock:
+            return self.latency + self.overload_latency * max(0, self.in_flight - 1)
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+
+class AxialHandler(BaseHTTPRequestHandler):
+    fixture_dir = FIXTURE_DIR
+    load = LoadModel()
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip('/')
+        if not path.startswith("/company/"):
+            self.send_error(404)
+            return
+        retry_after = self.load.enter()
+        if retry_after is not None:
+            self.send_response(429)
+            self.send_header("Retry-After", str(retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        try:
+            time.sleep(self.load.delay())
+            self.serve_fixture(path.split('/')[-1], parse_qs(parts.query).get('page', [None])[0])
+        finally:
+            self.load.leave()
+
+    def serve_fixture(self, slug, page=None):
+        fixture = os.path.join(self.fixture_dir, f"{slug}.html")
+        if page is not None and page.isdigit() and int(page) > 1:
+            page_fixture = os.path.join(self.fixture_dir, f"{slug}.page-{int(page)}.html")
+            if os.path.isfile(page_fixture):
+                fixture = page_fixture
+        if not os.path.isfile(fixture):
+            self.send_error(404)
+            return
+        with open(fixture, "rb") as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Keep benchmark and test output readable
+
+
+def make_server(port=0, fixture_dir=FIXTURE_DIR, latency=0.0, max_rps=None):
+    handler = type("FixtureHandler", (AxialHandler,), {"fixture_dir": fixture_dir,
+                                                       "load": LoadModel(latency, max_rps)})
+    return ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+
+def start_server(port=0, fixture_dir=FIXTURE_DIR, latency=0.0, max_rps=None):
+    # Serve in a background thread; returns (server, base_url). Call
+    # server.shutdown() when done.
+    server = make_server(port, fixture_dir, latency, max_rps)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve saved Axial profile pages locally")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=FIXTURE_DIR)
+    parser.add_argument("--latency", type=float, default=0.0, help="base response time in seconds")
+    parser.add_argument("--max-rps", type=float, default=None, help="answer 429 above this many requests per second")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.fixtures, args.latency, args.max_rps)
+    print(f"Serving {args.fixtures} at http://127.0.0.1:{args.port}/company/<slug>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,237 @@
+# Streaming output for scraped firms.
+#
+# Every writer takes one firm record at a time and puts it on disk straight
+# away, so memory stays flat however many firms a run covers:
+#
+#   text    - the legacy "Title:/Overview:/--- Transactions ---" format
+#   jsonl   - one JSON object per firm per line
+#   parquet - a firms table plus a flat transactions table, written as
+#             row-group batches into part files (needs pyarrow)
+#   deals   - the deduplicated cross-firm deal index in deals.db (see
+#             deal_store.py), which accumulates across runs
+#
+# All writers are safe to share between worker threads. The text and JSONL
+# writers are also safe across processes (each record is a single O_APPEND
+# write under an advisory file lock); parquet gives every writer its own part
+# file, so several processes can write into the same directory, and truncate()
+# only drops part files whose writer process is no longer running.
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+from deal_store import DealStoreWriter
+
+try:
+    import fcntl
+except ImportError: # Windows: threads are still serialised by the lock below
+    fcntl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+def format_text_record(data):
+    lines = [
+        f"Title: {data['Title']}",
+        f"Overview: {data['Overview']}",
+        f"Location: {data['Location']}",
+        f"URL: {data['URL']}",
+        "--- Transactions ---",
+    ]
+    if isinstance(data['Transactions'], list):
+        if data['Transactions']:
+            for i, transaction in enumerate(data['Transactions']):
+                lines.append(f"  Transaction {i+1}:")
+                lines.append(f"    Acquirer/Investor: {transaction.get('Acquirer/Investor', 'N/A')}")
+                lines.append(f"    Activity: {transaction.get('Activity', 'N/A')}")
+                lines.append(f"    Company: {transaction.get('Company', 'N/A')}")
+                lines.append(f"    Industry: {transaction.get('Industry', 'N/A')}")
+                lines.append(f"    Date: {transaction.get('Date', 'N/A')}")
+        else:
+            lines.append("  No transactions found.")
+    else: # Handle the case where 'Transactions' might be an error string
+        lines.append(f"  {data['Transactions']}")
+    return "\n".join(lines) + "\n\n" # blank line between companies
+
+
+class AppendWriter(object):
+    # One record -> one write() on an O_APPEND descriptor, so concurrent
+    # writers never interleave inside a record
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def format(self, record):
+        raise NotImplementedError
+
+    def write(self, record):
+        data = self.format(record).encode("utf-8")
+        with self.lock:
+            if fcntl is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_EX)
+            try:
+                os.write(self.fd, data)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def truncate(self):
+        with self.lock:
+            os.ftruncate(self.fd, 0)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class TextWriter(AppendWriter):
+    def format(self, record):
+        return format_text_record(record)
+
+
+class JsonlWriter(AppendWriter):
+    def format(self, record):
+        return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+
+FIRM_SCHEMA_FIELDS = ('title', 'overview', 'location', 'url', 'transaction_count', 'error')
+TRANSACTION_SCHEMA_FIELDS = ('firm_title', 'position', 'acquirer_investor', 'activity', 'company', 'industry', 'date')
+
+
+def writer_is_running(part_name):
+    # True if the process named in a part file ("part-<pid>-<id>.parquet") is alive
+    pid = part_name.split("-")[1] if part_name.count("-") >= 2 else ""
+    if not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ParquetWriter(object):
+    # Writes <directory>/firms/part-*.parquet and
+    # <directory>/transactions/part-*.parquet. Rows are buffered only up to
+    # batch_size before being flushed as a row group, so a crash can lose at
+    # most one unflushed batch; text and JSONL are durable per firm.
+    def __init__(self, directory, batch_size=500):
+        if pa is None:
+            raise ImportError("Parquet output needs pyarrow (pip install pyarrow)")
+        self.directory = directory
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.part = f"part-{os.getpid()}-{uuid.uuid4().hex[:8]}.parquet"
+        self.started = time.time()
+        self.firm_rows = []
+        self.transaction_rows = []
+        self.writers = {}
+        for table in ("firms", "transactions"):
+            os.makedirs(os.path.join(directory, table), exist_ok=True)
+
+    def write(self, record):
+        transactions = record['Transactions'] if isinstance(record['Transactions'], list) else []
+        with self.lock:
+            self.firm_rows.append({
+                'title': record['Title'],
+                'overview': record['Overview'],
+                'location': record['Location'],
+                'url': record['URL'],
+                'transaction_count': len(transactions),
+                'error': None if isinstance(record['Transactions'], list) else str(record['Transactions']),
+            })
+            for position, transaction in enumerate(transactions):
+                self.transaction_rows.append({
+                    'firm_title': record['Title'],
+                    'position': position,
+                    'acquirer_investor': transaction.get('Acquirer/Investor', 'N/A'),
+                    'activity': transaction.get('Activity', 'N/A'),
+                    'company': transaction.get('Company', 'N/A'),
+                    'industry': transaction.get('Industry', 'N/A'),
+                    'date': transaction.get('Date', 'N/A'),
+                })
+            if len(self.firm_rows) >= self.batch_size or len(self.transaction_rows) >= self.batch_size:
+                self.flush_locked()
+
+    def flush_locked(self):
+        for table, rows, fields in (("firms", self.firm_rows, FIRM_SCHEMA_FIELDS),
+                                    ("transactions", self.transaction_rows, TRANSACTION_SCHEMA_FIELDS)):
+            if not rows:
+                continue
+            batch = pa.Table.from_pylist(rows, schema=self.schema(fields))
+            if table not in self.writers:
+                path = os.path.join(self.directory, table, self.part)
+                self.writers[table] = pq.ParquetWriter(path, batch.schema)
+            self.writers[table].write_table(batch)
+            del rows[:]
+
+    @staticmethod
+    def schema(fields):
+        types = {'transaction_count': pa.int32(), 'position': pa.int32()}
+        return pa.schema([(field, types.get(field, pa.string())) for field in fields])
+
+    def truncate(self):
+        # Start the dataset over: drop part files left by earlier runs. Parts
+        # written since this writer started, or by a process that is still
+        # running, belong to another live writer and are kept.
+        with self.lock:
+            for table in ("firms", "transactions"):
+                for path in glob.glob(os.path.join(self.directory, table, "part-*.parquet")):
+                    name = os.path.basename(path)
+                    if name == self.part or writer_is_running(name):
+                        continue
+                    try:
+                        if os.path.getmtime(path) < self.started:
+                            os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+    def close(self):
+        with self.lock:
+            self.flush_locked()
+            for writer in self.writers.values():
+                writer.close()
+            self.writers = {}
+
+
+class MultiWriter(object):
+    def __init__(self, writers):
+        self.writers = writers
+
+    def write(self, record):
+        for writer in self.writers:
+            writer.write(record)
+
+    def truncate(self):
+        for writer in self.writers:
+            writer.truncate()
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+
+
+def open_writers(formats, text_path="scraped_data.txt", jsonl_path="scraped_data.jsonl",
+                 parquet_dir="scraped_data_parquet", deals_path="deals.db"):
+    writers = []
+    for output_format in formats:
+        if output_format == "text":
+            writers.append(TextWriter(text_path))
+        elif output_format == "jsonl":
+            writers.append(JsonlWriter(jsonl_path))
+        elif output_format == "parquet":
+            writers.append(ParquetWriter(parquet_dir))
+        elif output_format == "deals":
+            writers.append(DealStoreWriter(deals_path))
+        else:
+            raise ValueError(f"Unknown output format: {output_format}")
+    return MultiWriter(writers)
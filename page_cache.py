@@ -0,0 +1,182 @@
+# Content-hash cache of scraped profiles, so unchanged pages are not extracted again.
+#
+# Most profiles are the same between runs. After a profile has loaded, the
+# scraper hashes its rendered body text (when a browser loaded it) or its raw
+# HTML (when it came over plain HTTP) and looks the URL up here. If the hash matches the one stored
+# with the last record, that record is reused and the Overview/Location/link
+# extraction and the walk through every transactions page are skipped.
+#
+# Only the first transactions page is part of the hash. New deals appear at the
+# top of that page, but an edit on a later page would not change it, so entries
+# expire after ttl seconds and the firm is then scraped in full again. The cache
+# is also capped at max_entries records and max_bytes of stored JSON, and
+# evicts the least recently used entries first. It is safe to share between
+# worker threads.
+#
+#   python page_cache.py            # size and age of the cache
+#   python page_cache.py --clear
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from instrumentation import metrics
+from transaction_history import is_placeholder
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    record TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used);
+"""
+
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+def content_hash(content, kind="text"):
+    # kind keeps body-text and raw-HTML hashes of the same page apart
+    return hashlib.sha256(f"{kind}\u0001{content}".encode("utf-8")).hexdigest()
+
+
+def is_cacheable(record):
+    # Error records and pages with incomplete tombstones are scraped again next time
+    transactions = record['Transactions']
+    return isinstance(transactions, list) and not any(is_placeholder(t) for t in transactions)
+
+
+class PageCache(object):
+    def __init__(self, path="page_cache.db", ttl=DEFAULT_TTL, max_entries=50000, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # url -> (content hash, True if it matched): what lookup saw, for store
+        self.pending = {}
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stored': 0, 'evicted': 0}
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        with self.lock:
+            self.prune_expired()
+            self.entries, self.bytes = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+
+    def prune_expired(self):
+        # Caller holds the lock
+        if self.ttl:
+            self.conn.execute("DELETE FROM pages WHERE stored_at < ?", (time.time() - self.ttl,))
+
+    def lookup(self, url, page_hash):
+        # The cached record if the page is unchanged since it was stored, else None
+        now = time.time()
+        with self.lock:
+            found = self.conn.execute("SELECT content_hash, record, stored_at FROM pages WHERE url = ?",
+                                      (url,)).fetchone()
+            hit = found is not None and found[0] == page_hash
+            if hit and self.ttl and now - found[2] > self.ttl:
+                hit = False
+                self.stats['expired'] += 1
+            if hit:
+                self.conn.execute("UPDATE pages SET last_used = ? WHERE url = ?", (now, url))
+            self.pending[url] = (page_hash, hit)
+            self.stats['hits' if hit else 'misses'] += 1
+        metrics.count('page_cache_hits' if hit else 'page_cache_misses')
+        return json.loads(found[1]) if hit else None
+
+    def reused(self, url):
+        # True if the last lookup for url returned a cached record
+        with self.lock:
+            return self.pending.get(url, (None, False))[1]
+
+    def forget(self, url):
+        # Drop what lookup() saw for url when the record will not be stored
+        # (reused as is, or the firm failed), so pending does not grow
+        with self.lock:
+            self.pending.pop(url, None)
+
+    def store(self, url, record):
+        # Save the record under the hash lookup() saw for url. A reused record
+        # keeps its original stored_at, so the TTL still forces a full re-scrape.
+        with self.lock:
+            page_hash, hit = self.pending.pop(url, (None, False))
+        if page_hash is None or hit or not is_cacheable(record):
+            return
+        payload = json.dumps(record, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        now = time.time()
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                              (url, page_hash, payload, size, now, now))
+            if old is None:
+                self.entries += 1
+            self.bytes += size - (old[0] if old is not None else 0)
+            self.stats['stored'] += 1
+            self.evict()
+
+    def evict(self):
+        # Drop least recently used entries until both limits hold; caller holds the lock
+        while self.entries > self.max_entries or self.bytes > self.max_bytes:
+            rows = self.conn.execute("SELECT url, size FROM pages ORDER BY last_used LIMIT ?",
+                                     (max(self.entries - self.max_entries, 100),)).fetchall()
+            if not rows:
+                break
+            dropped = []
+            for url, size in rows:
+                if self.entries <= self.max_entries and self.bytes <= self.max_bytes:
+                    break
+                dropped.append((url,))
+                self.entries -= 1
+                self.bytes -= size
+            self.conn.executemany("DELETE FROM pages WHERE url = ?", dropped)
+            self.stats['evicted'] += len(dropped)
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM pages")
+            self.entries, self.bytes = 0, 0
+            self.pending.clear()
+
+    def print_summary(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        print(f"\n=== PAGE CACHE ({self.path}) ===")
+        if lookups:
+            print(f"Unchanged pages reused: {self.stats['hits']} of {lookups} "
+                  f"({self.stats['hits'] / lookups * 100:.0f}%), {self.stats['expired']} expired")
+        print(f"Stored this run: {self.stats['stored']}, evicted: {self.stats['evicted']}")
+        print(f"Entries: {self.entries}, {self.bytes / 1024 / 1024:.1f} MB")
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the scraped page cache")
+    parser.add_argument("--db", default="page_cache.db")
+    parser.add_argument("--clear", action="store_true", help="drop every cached page")
+    args = parser.parse_args()
+
+    cache = PageCache(args.db)
+    try:
+        if args.clear:
+            cache.clear()
+            print(f"Cleared {args.db}")
+            return
+        oldest = cache.conn.execute("SELECT MIN(stored_at) FROM pages").fetchone()[0]
+        print(f"{cache.entries} cached pages, {cache.bytes / 1024 / 1024:.1f} MB")
+        if oldest is not None:
+            print(f"Oldest entry stored {(time.time() - oldest) / 3600:.1f} hours ago "
+                  f"(expires after {cache.ttl / 3600:.0f} hours)")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
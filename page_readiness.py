@@ -0,0 +1,136 @@
+# Condition-based page readiness for the Axial profile pages.
+#
+# Replaces the fixed time.sleep() calls after driver.get() and after clicking
+# the pagination button: every wait polls for a real signal on the page, has
+# its own timeout, and records how long it actually took.
+import time
+
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from instrumentation import WAIT_PREFIX, metrics
+
+TOMBSTONE_TAG = "axl-legacy-tombstone"
+# Heading levels the Overview title may use; every backend looks at the same ones
+OVERVIEW_HEADING_TAGS = ("h2", "h3", "h4", "h5", "h6")
+OVERVIEW_HEADING_XPATH = " | ".join(f"//{tag}[contains(text(), 'Overview')]" for tag in OVERVIEW_HEADING_TAGS)
+NEXT_BUTTON_XPATH = "//button[contains(@aria-label, 'Next page') or contains(@class, 'pagination-next')] | //button[./*[name()='svg' and contains(@data-icon, 'arrow-right')]] | //button[contains(., '>') and not(@disabled)]"
+SHOW_MORE_XPATH = "//span[@more-label and contains(text(), 'Show full description')]"
+SHOW_MORE_BUTTON_XPATH = "//p[contains(@class, 'p--expand-label') and .//span[@more-label]]"
+
+# Seconds to wait for each signal before giving up
+DEFAULT_TIMEOUTS = {
+    'body': 10,         # document loaded and <body> present
+    'profile': 8,       # Angular has rendered the profile (overview heading, website link or tombstones)
+    'tombstones': 5,    # at least one axl-legacy-tombstone on the page
+    'page_change': 10,  # tombstone set replaced after a pagination click
+    'description': 3,   # "Show full description" collapsed after expanding
+}
+
+# One round-trip snapshot of the visible tombstones, used to tell pages apart
+TOMBSTONE_SIGNATURE_JS = (
+    "return Array.from(document.getElementsByTagName('" + TOMBSTONE_TAG + "'))"
+    ".map(function (t) { return t.textContent; }).join('\\u0001');"
+)
+
+
+def tombstone_signature(driver):
+    try:
+        return driver.execute_script(TOMBSTONE_SIGNATURE_JS)
+    except Exception:
+        return None
+
+
+class tombstones_changed(object):
+    # Expected condition: the first old tombstone went stale or the tombstone
+    # text on the page is no longer what it was before the click
+    def __init__(self, old_tombstones, old_signature):
+        self.old_first = old_tombstones[0] if old_tombstones else None
+        self.old_signature = old_signature
+
+    def __call__(self, driver):
+        if self.old_first is not None:
+            try:
+                self.old_first.is_enabled()
+            except StaleElementReferenceException:
+                return True
+        signature = tombstone_signature(driver)
+        return bool(signature) and signature != self.old_signature
+
+
+class PageReadiness(object):
+    def __init__(self, driver, timeouts=None, poll_frequency=0.1):
+        self.driver = driver
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.poll_frequency = poll_frequency
+        self.timings = {} # signal -> {'count', 'seconds', 'timeouts'}, bounded however long the run
+        self.last_load_seconds = None
+
+    def wait_for(self, signal, condition):
+        # Returns the condition's result, or None if the signal never showed up
+        started = time.perf_counter()
+        result = None
+        try:
+            result = WebDriverWait(self.driver, self.timeouts[signal], self.poll_frequency).until(condition)
+        except TimeoutException:
+            pass
+        seconds = time.perf_counter() - started
+        entry = self.timings.setdefault(signal, {'count': 0, 'seconds': 0.0, 'timeouts': 0})
+        entry['count'] += 1
+        entry['seconds'] += seconds
+        if result is None:
+            entry['timeouts'] += 1
+        metrics.observe(WAIT_PREFIX + signal, seconds)
+        if result is None:
+            metrics.count('wait_timeouts')
+        return result
+
+    def body_ready(self):
+        return self.wait_for('body', lambda d: d.execute_script("return document.readyState") == "complete"
+                             and d.find_element(By.TAG_NAME, "body"))
+
+    def profile_rendered(self):
+        return self.wait_for('profile', EC.any_of(
+            EC.presence_of_element_located((By.XPATH, OVERVIEW_HEADING_XPATH)),
+            EC.presence_of_element_located((By.CSS_SELECTOR, "a.u-link")),
+            EC.presence_of_element_located((By.TAG_NAME, TOMBSTONE_TAG)),
+        ))
+
+    def page_loaded(self):
+        # What used to be time.sleep(3) after driver.get()
+        return self.body_ready() is not None and self.profile_rendered() is not None
+
+    def open(self, url):
+        # driver.get() plus page_loaded(); last_load_seconds is what the rate
+        # limiter judges as the response time
+        self.last_load_seconds = None
+        started = time.perf_counter()
+        self.driver.get(url)
+        metrics.count('pages')
+        loaded = self.page_loaded()
+        self.last_load_seconds = time.perf_counter() - started
+        return loaded
+
+    def tombstones_present(self):
+        return self.wait_for('tombstones', EC.presence_of_all_elements_located((By.TAG_NAME, TOMBSTONE_TAG))) or []
+
+    def tombstones_changed(self, old_tombstones, old_signature):
+        # What used to be time.sleep(3) after next_button.click()
+        return self.wait_for('page_change', tombstones_changed(old_tombstones, old_signature)) is not None
+
+    def description_expanded(self):
+        return self.wait_for('description', EC.invisibility_of_element_located((By.XPATH, SHOW_MORE_XPATH)))
+
+    def totals(self):
+        return {signal: dict(entry) for signal, entry in self.timings.items()}
+
+    def print_summary(self):
+        print(f"\n=== PAGE WAITS ===")
+        for signal, entry in sorted(self.totals().items()):
+            average = entry['seconds'] / entry['count']
+            print(f"{signal}: {entry['count']} waits, {entry['seconds']:.2f}s total, "
+                  f"{average:.2f}s avg, {entry['timeouts']} timed out")
@@ -0,0 +1,70 @@
+# Keyword-based section extraction from the rendered page text, shared by
+# the Selenium and HTTP fetch paths.
+#
+# PageTextIndex does the expensive work once per page: the text is split and
+# lowercased a single time, keyword lookups are one str.find over the
+# lowercased text plus a bisect to turn the offset into a line number, and
+# heading lines are found with one pass of a compiled alternation over the
+# whole text. Each extract_section call after that only walks the handful of
+# lines it returns.
+import re
+from bisect import bisect_right
+from itertools import accumulate
+
+# Lines containing any of these end a section
+HEADING_KEYWORDS = ["Overview", "Location", "Transactions", "Team", "Contact"]
+
+# Look at most this many lines past the keyword, and keep at most this many
+SECTION_WINDOW = 15
+SECTION_MAX_LINES = 5
+
+
+class PageTextIndex(object):
+    def __init__(self, page_text, heading_keywords=HEADING_KEYWORDS):
+        self.lines = page_text.split('\n')
+        self.lower_text = page_text.lower()
+        lower_lines = self.lower_text.split('\n')
+        # Offset of each line in lower_text (lowercasing can change lengths,
+        # so offsets come from the lowercased lines themselves)
+        self.line_starts = [0] + list(accumulate(len(line) + 1 for line in lower_lines))[:-1]
+        # One scan of the whole text finds every line that looks like a heading
+        heading_pattern = re.compile("|".join(re.escape(keyword.lower()) for keyword in heading_keywords))
+        self.heading_lines = {self.line_of(match.start()) for match in heading_pattern.finditer(self.lower_text)}
+        self.first_lines = {}
+
+    def line_of(self, offset):
+        return bisect_right(self.line_starts, offset) - 1
+
+    @property
+    def heading_positions(self):
+        return sorted(self.heading_lines)
+
+    def first_line_containing(self, keyword):
+        # Index of the first line containing keyword (case-insensitive), or -1
+        keyword = keyword.lower()
+        if keyword not in self.first_lines:
+            offset = self.lower_text.find(keyword)
+            self.first_lines[keyword] = -1 if offset == -1 else self.line_of(offset)
+        return self.first_lines[keyword]
+
+    def extract_section(self, keyword_list):
+        # Text following the first keyword that appears on the page, stopping
+        # at an empty line or the next heading
+        for keyword in keyword_list:
+            start_idx = self.first_line_containing(keyword)
+            if start_idx != -1:
+                section_lines = []
+                for i in range(start_idx + 1, min(start_idx + SECTION_WINDOW, len(self.lines))):
+                    line_content = self.lines[i].strip()
+                    if not line_content or i in self.heading_lines:
+                        break
+                    section_lines.append(line_content)
+                    if len(section_lines) >= SECTION_MAX_LINES:
+                        break
+                return ' '.join(section_lines)
+        return None
+
+
+# Helper to extract section by keyword (for Overview and Location)
+def extract_section(page_text, keyword_list):
+    return PageTextIndex(page_text).extract_section(keyword_list)
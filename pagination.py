@@ -0,0 +1,211 @@
+# Pagination engine for the transactions list.
+#
+# The click loop only reaches page N after N-1 clicks, each waiting for the
+# tombstones to be swapped out. When the pagination control links to its pages
+# (?page=2, ?p=3, ...), the page count and page parameter are read from it and
+# the remaining pages are loaded directly: several at once over HTTP or in
+# extra tabs, or one after another with driver.get() when only the browser
+# can render them. If the last page loaded still links further on, the next
+# batch is planned from its control.
+#
+# However a page was reached, its tombstone fingerprints are compared with the
+# pages already read. A page that only repeats earlier tombstones (a server
+# that ignores the page parameter, a click that did not advance) stops
+# pagination instead of looping or duplicating deals, and the direct route
+# reports failure so the caller can fall back to clicking.
+import asyncio
+import contextvars
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from instrumentation import metrics
+from page_readiness import NEXT_BUTTON_XPATH
+from transaction_history import is_placeholder, take_until_known, transaction_fingerprint
+
+# Query parameters that select a page of the list, in order of preference
+PAGE_PARAMS = ("page", "p", "pg", "pageNumber", "page_number", "pageIndex")
+PAGE_OF_RE = re.compile(r"\bpage\s+\d+\s+of\s+(\d+)\b", re.IGNORECASE)
+
+# Never plan more pages than this for one firm, whatever the control claims
+MAX_PAGES = 200
+
+# Pages loaded at once for one firm
+PAGE_WORKERS = 4
+
+# Function body: the page URL, the label and href of every link or button in
+# the pagination control(s), their text ("Page 1 of 5") and whether the next
+# button is enabled
+PAGINATION_JS = """
+var nextXpath = """ + json.dumps(NEXT_BUTTON_XPATH) + """;
+var controls = [];
+var text = [];
+document.querySelectorAll('[class*="pagination"]').forEach(function (container) {
+    text.push(container.innerText || '');
+    [container].concat(Array.from(container.querySelectorAll('a, button'))).forEach(function (el) {
+        if (el.tagName === 'A' || el.tagName === 'BUTTON') {
+            controls.push([(el.innerText || '').trim(), el.getAttribute('href')]);
+        }
+    });
+});
+var next = document.evaluate(nextXpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+return {
+    url: location.href,
+    controls: controls,
+    text: text.join('\\n'),
+    hasNext: !!next && !(next.getAttribute('class') || '').includes('disabled') && !next.disabled
+};
+"""
+
+
+class PageInfo(object):
+    # What the pagination control says: how many pages there are (None if it
+    # does not say) and which query parameter selects one (None if the pages
+    # are only reachable by clicking)
+    def __init__(self, url, count=None, param=None):
+        self.url = url
+        self.count = count
+        self.param = param
+
+    @property
+    def direct(self):
+        return self.param is not None and self.count is not None
+
+    def page_url(self, number):
+        parts = urlsplit(self.url)
+        query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != self.param]
+        query.append((self.param, str(number)))
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def page_info(url, controls, text=""):
+    # controls: (label, href) of the links and buttons in the pagination control
+    numbers = []
+    param = None
+    for label, href in controls:
+        label = (label or "").strip()
+        if label.isdigit():
+            numbers.append(int(label))
+        if not href or href.startswith("javascript:"):
+            continue
+        query = dict(parse_qsl(urlsplit(urljoin(url, href)).query))
+        for name in PAGE_PARAMS:
+            if query.get(name, "").isdigit():
+                param = param or name
+                numbers.append(int(query[name]))
+                break
+    match = PAGE_OF_RE.search(text or "")
+    if match:
+        numbers.append(int(match.group(1)))
+    count = min(max(numbers), MAX_PAGES) if numbers else None
+    return PageInfo(url, count, param)
+
+
+def browser_page_info(pagination):
+    # PageInfo from what PAGINATION_JS returned, or None if there is no next page
+    if not pagination or not pagination.get('hasNext'):
+        return None
+    return page_info(pagination['url'], pagination['controls'], pagination['text'])
+
+
+class PageProgress(object):
+    # Fingerprints of every tombstone read so far for one firm
+    def __init__(self):
+        self.seen = set()
+        self.pages = 0
+
+    def advance(self, transactions):
+        # True if the page shows tombstones we have not read yet
+        fingerprints = {transaction_fingerprint(t) for t in transactions if not is_placeholder(t)}
+        if not transactions or (fingerprints and fingerprints <= self.seen):
+            return False
+        self.seen |= fingerprints
+        self.pages += 1
+        return True
+
+
+class PageCollector(object):
+    # Joins the pages of one firm in page order, stopping at the first stored
+    # transaction in incremental runs
+    def __init__(self, first_page, known_fingerprints=None):
+        self.known_fingerprints = known_fingerprints
+        self.progress = PageProgress()
+        self.transactions = []
+        self.done = False
+        self.add(first_page)
+
+    def add(self, page):
+        # False if the page did not move past the pages already added
+        if not self.progress.advance(page):
+            return False
+        if self.known_fingerprints:
+            page, self.done = take_until_known(page, self.known_fingerprints)
+        self.transactions.extend(page)
+        return True
+
+
+def next_batch(info, next_page, workers):
+    # Page numbers to load next, given the latest control seen. Batches are no
+    # bigger than the number of workers, so an incremental run that reaches a
+    # stored transaction does not load the pages after it.
+    return list(range(next_page, min(info.count, next_page + max(1, workers) - 1) + 1))
+
+
+def collect_pages(info, first_page, fetch_page, known_fingerprints=None, workers=PAGE_WORKERS):
+    # Every transaction from page 1 (already read) through the last page.
+    # fetch_page(url) returns (transactions, PageInfo of that page's control or
+    # None on the last page), or None if the page could not be read. Returns
+    # None when a page failed or did not advance, so the caller can fall back.
+    # info is the control on page 1, which has a next page and info.direct.
+    collector = PageCollector(first_page, known_fingerprints)
+    info = merge_info(info, info, 1)
+    next_page = 2
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while not collector.done and next_page <= info.count:
+            numbers = next_batch(info, next_page, workers)
+            # Each page runs in a copy of this thread's context, so its counters
+            # and timings are attributed to the firm being scraped
+            contexts = [contextvars.copy_context() for _ in numbers]
+            with metrics.timer('pagination'):
+                pages = list(executor.map(lambda context, url: context.run(fetch_page, url), contexts,
+                                          [info.page_url(number) for number in numbers]))
+            metrics.count('direct_pages', len(numbers))
+            for page in pages:
+                if page is None or not collector.add(page[0]):
+                    return None
+                if collector.done:
+                    return collector.transactions
+            next_page = numbers[-1] + 1
+            info = merge_info(info, pages[-1][1], numbers[-1])
+    return collector.transactions
+
+
+async def collect_pages_async(info, first_page, fetch_page, known_fingerprints=None, workers=PAGE_WORKERS):
+    # collect_pages for a coroutine fetch_page, at most `workers` pages at once
+    collector = PageCollector(first_page, known_fingerprints)
+    info = merge_info(info, info, 1)
+    next_page = 2
+    while not collector.done and next_page <= info.count:
+        numbers = next_batch(info, next_page, workers)
+        with metrics.timer('pagination'):
+            pages = await asyncio.gather(*(fetch_page(info.page_url(number)) for number in numbers))
+        metrics.count('direct_pages', len(numbers))
+        for page in pages:
+            if page is None or not collector.add(page[0]):
+                return None
+            if collector.done:
+                return collector.transactions
+        next_page = numbers[-1] + 1
+        info = merge_info(info, pages[-1][1], numbers[-1])
+    return collector.transactions
+
+
+def merge_info(info, later, last_number):
+    # later is the control on page last_number, None if that was the last page.
+    # A windowed control ("1 2 3 ... >") reveals more pages as we go, and an
+    # enabled next button means at least one more page whatever the numbers say.
+    if later is None:
+        return PageInfo(info.url, last_number, info.param)
+    count = min(max(info.count, later.count or 0, last_number + 1), MAX_PAGES)
+    return PageInfo(info.url, count, info.param or later.param)
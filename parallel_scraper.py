@@ -0,0 +1,219 @@
+# Worker-pool mode for scraper.py: N workers, each owning its own headless
+# Chrome session (started only when the HTTP backend cannot parse a page),
+# pull firms from the shared job ledger until no work is left. Every finished
+# firm is streamed to the output writers straight away, so a restarted run
+# only does the remaining work. All workers share one DomainLimiter, so how
+# many of them hit axial.net at once adapts to how the site is responding.
+#
+#   python parallel_scraper.py --workers 4
+#   python parallel_scraper.py --workers 8 --limit 200 --format jsonl,parquet
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import http_backend
+from driver_factory import DEFAULT_PROFILE_DIR
+from instrumentation import metrics
+from job_ledger import JobLedger
+from master_list import parse_shard
+from output_writers import open_writers
+from page_cache import PageCache
+from rate_limiter import DomainLimiter
+from scraper import LazyBrowser, load_valid_urls, scrape_job
+from transaction_history import TransactionHistory
+
+# Give up on a worker after this many driver crashes in a row
+MAX_DRIVER_RESTARTS = 3
+
+print_lock = threading.Lock()
+
+
+def log(worker_id, message):
+    with print_lock:
+        print(f"[worker {worker_id}] {message}")
+
+
+def run_worker(worker_id, ledger, writer, headless=True, pause=0, backend="http", history=None, recycle_after=50,
+               limiter=None, page_cache=None, max_browser_mb=None):
+    # Each worker owns its browser and HTTP session; only the ledger, the
+    # transaction history, the rate limiter, the page cache and the output
+    # writer are shared with other workers
+    stats = {'worker': worker_id, 'firms': 0, 'errors': 0, 'restarts': 0, 'seconds': 0.0, 'wait_seconds': 0.0}
+    started = time.perf_counter()
+    # Chrome locks its user-data dir, so every worker keeps its own profile
+    browser = LazyBrowser(headless=headless, profile_dir=os.path.join(DEFAULT_PROFILE_DIR, f"worker-{worker_id}"),
+                          recycle_after=recycle_after, max_browser_mb=max_browser_mb)
+    session = http_backend.create_session() if backend == "http" else None
+    consecutive_crashes = 0
+
+    try:
+        while True:
+            job = ledger.claim_next()
+            if job is None:
+                delay = ledger.seconds_until_next_retry()
+                if delay is None:
+                    break
+                time.sleep(min(delay, 5))
+                continue
+
+            log(worker_id, f"Processing: {job['Title']}")
+            record = scrape_job(job, ledger, browser, session, writer, history, limiter, page_cache)
+            stats['firms'] += 1
+
+            if record is None or not isinstance(record['Transactions'], list):
+                stats['errors'] += 1
+                # A dead driver only takes down this worker's session; the next
+                # firm that needs the browser starts a fresh one
+                if browser.driver is not None and not browser.is_alive():
+                    log(worker_id, "Driver crashed, restarting Chrome")
+                    browser.quit()
+                    stats['restarts'] += 1
+                    consecutive_crashes += 1
+                    if consecutive_crashes > MAX_DRIVER_RESTARTS:
+                        log(worker_id, "✗ Too many driver crashes, stopping this worker")
+                        break
+            else:
+                consecutive_crashes = 0
+
+            if pause:
+                time.sleep(pause) # Optional fixed pause on top of the rate limiter
+
+    finally:
+        browser.quit()
+        if session is not None:
+            session.close()
+
+    stats['seconds'] = time.perf_counter() - started
+    stats['wait_seconds'] = sum(entry['seconds'] for entry in browser.readiness.totals().values())
+    stats['browser'] = browser.stats
+    return stats
+
+
+def scrape_parallel(ledger, writer, num_workers=4, headless=True, pause=0, backend="http", history=None,
+                    recycle_after=50, limiter=None, page_cache=None, max_browser_mb=None):
+    all_stats = []
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = {
+            executor.submit(run_worker, worker_id, ledger, writer, headless, pause, backend, history,
+                            recycle_after, limiter, page_cache, max_browser_mb): worker_id
+            for worker_id in range(num_workers)
+        }
+        for future in as_completed(futures):
+            worker_id = futures[future]
+            try:
+                all_stats.append(future.result())
+            except Exception as e:
+                # Its claimed firm stays 'running' and is picked up again on the next run
+                log(worker_id, f"✗ Worker failed: {e}")
+
+    return sorted(all_stats, key=lambda s: s['worker'])
+
+
+def print_throughput(all_stats, elapsed):
+    print(f"\n=== WORKER THROUGHPUT ===")
+    for stats in all_stats:
+        rate = stats['firms'] / stats['seconds'] * 60 if stats['seconds'] else 0.0
+        print(f"Worker {stats['worker']}: {stats['firms']} firms in {stats['seconds']:.1f}s "
+              f"({rate:.1f} firms/min, {stats['wait_seconds']:.1f}s waiting on pages, "
+              f"{stats['errors']} errors, {stats['restarts']} driver restarts)")
+        browser = stats['browser']
+        if browser['starts']:
+            print(f"  Chrome: {browser['starts']} starts, {browser['startup_seconds'] / browser['starts']:.2f}s avg startup, "
+                  f"{browser['firms']} firms, {browser['bytes'] / max(browser['firms'], 1) / 1024:.0f} KB/firm"
+                  + (f", {sum(browser['recycles'].values())} recycles" if browser['recycles'] else ""))
+    total = sum(stats['firms'] for stats in all_stats)
+    rate = total / elapsed * 60 if elapsed else 0.0
+    print(f"Total: {total} firms in {elapsed:.1f}s ({rate:.1f} firms/min)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape Axial profiles with a pool of headless Chrome workers")
+    parser.add_argument("--workers", type=int, default=4, help="number of concurrent browser sessions")
+    parser.add_argument("--limit", type=int, default=None, help="only scrape the first N firms")
+    parser.add_argument("--shard", default=None,
+                        help="only scrape shard I of N of the master list, e.g. 2/8 (reads just those rows)")
+    parser.add_argument("--format", default="text,jsonl",
+                        help="comma-separated output formats: text, jsonl, parquet, deals")
+    parser.add_argument("--output", default="scraped_data", help="output path without extension")
+    parser.add_argument("--ledger", default="scrape_ledger.db", help="job ledger used to resume interrupted runs")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only scrape transactions newer than the stored history for each firm")
+    parser.add_argument("--history", default="transaction_history.db", help="stored transactions for --incremental")
+    parser.add_argument("--page-cache", default="page_cache.db",
+                        help="reuse the last record of profiles whose page has not changed")
+    parser.add_argument("--cache-ttl", type=float, default=168,
+                        help="hours before a cached profile is scraped in full again")
+    parser.add_argument("--no-page-cache", action="store_true", help="always extract every profile")
+    parser.add_argument("--refresh", action="store_true", help="scrape every firm again, even those already done")
+    parser.add_argument("--pause", type=float, default=0, help="extra seconds each worker waits between companies")
+    parser.add_argument("--rate", type=float, default=2.0, help="ceiling on page requests per second to axial.net")
+    parser.add_argument("--slow", type=float, default=8.0,
+                        help="page loads slower than this many seconds make the workers back off")
+    parser.add_argument("--backend", choices=["http", "selenium"], default="http",
+                        help="'http' parses profiles over HTTP and only falls back to Chrome when needed")
+    parser.add_argument("--recycle-after", type=int, default=50, help="restart each worker's Chrome after N firms")
+    parser.add_argument("--max-browser-mb", type=float, default=None,
+                        help="restart a worker's Chrome once its resident memory passes this")
+    parser.add_argument("--show-browser", action="store_true", help="run Chrome with a visible window")
+    parser.add_argument("--metrics", default="scrape_metrics.json", help="where to save per-stage timings and counters")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve the metrics as Prometheus text on this port while running")
+    args = parser.parse_args()
+
+    shard = parse_shard(args.shard) if args.shard else None
+    valid_urls = load_valid_urls(stop=args.limit if shard is None else None, shard=shard)
+    if args.limit is not None:
+        valid_urls = valid_urls.head(args.limit)
+
+    ledger = JobLedger(args.ledger)
+    fresh_run = args.refresh or not ledger.has_completed()
+    ledger.sync(row for _, row in valid_urls.iterrows())
+    if args.refresh:
+        ledger.requeue_all()
+
+    formats = [f.strip() for f in args.format.split(",") if f.strip()]
+    writer = open_writers(formats, f"{args.output}.txt", f"{args.output}.jsonl", f"{args.output}_parquet")
+    if fresh_run:
+        writer.truncate()
+    history = TransactionHistory(args.history) if args.incremental else None
+    page_cache = None if args.no_page_cache else PageCache(args.page_cache, ttl=args.cache_ttl * 3600)
+    # Start with two workers fetching at once and let the limiter ramp up to --workers
+    num_workers = max(1, args.workers)
+    limiter = DomainLimiter(rate=args.rate, initial_concurrency=min(2, num_workers), max_concurrency=num_workers,
+                            slow_seconds=args.slow)
+
+    if args.metrics_port is not None:
+        metrics.serve(args.metrics_port)
+
+    print(f"Found {len(valid_urls)} companies with valid URLs, using {args.workers} workers")
+
+    started = time.perf_counter()
+    all_stats = scrape_parallel(ledger, writer, num_workers, not args.show_browser,
+                                args.pause, args.backend, history, args.recycle_after, limiter, page_cache,
+                                args.max_browser_mb)
+    elapsed = time.perf_counter() - started
+
+    print(f"\n=== SCRAPING COMPLETE ===")
+    print_throughput(all_stats, elapsed)
+    writer.close()
+    print(f"Results saved as {', '.join(formats)} under '{args.output}'")
+    ledger.print_summary()
+    limiter.print_summary()
+    if page_cache is not None:
+        page_cache.print_summary()
+    metrics.print_summary()
+    if args.metrics:
+        metrics.write_json(args.metrics)
+        print(f"Metrics saved to {args.metrics}")
+    ledger.close()
+    if history is not None:
+        history.close()
+    if page_cache is not None:
+        page_cache.close()
+
+
+if __name__ == "__main__":
+    main()
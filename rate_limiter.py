@@ -0,0 +1,261 @@
+# Per-domain rate limiting shared by every fetch path (HTTP backend, Selenium
+# and the async engine).
+#
+# Each host gets a token bucket, which caps requests per second, and an AIMD
+# controller, which caps how many requests are in flight. Healthy responses
+# raise the concurrency limit by one per window of successes (additive
+# increase); slow responses, error pages, 429s and runs of empty tombstone
+# sets halve it (multiplicative decrease). A 429 also pauses the host's bucket
+# for its Retry-After. The crawl therefore settles just under whatever rate
+# axial.net will sustain instead of a fixed sleep between companies.
+#
+# Try it against the mock server, which answers 429 above --max-rps and slows
+# down as more requests pile up:
+#   python rate_limiter.py --max-rps 5 --latency 0.2 --requests 200
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from instrumentation import WAIT_PREFIX, metrics
+
+# Outcomes callers report for each request
+OK = "ok"
+SLOW = "slow"
+ERROR = "error"
+THROTTLED = "throttled"
+EMPTY = "empty"
+
+BACKOFF_OUTCOMES = {SLOW, ERROR, THROTTLED}
+
+# How long to wait between polls when a host has no free slot
+POLL_SECONDS = 0.05
+
+# Pause used for a 429 without a usable Retry-After header
+DEFAULT_RETRY_AFTER = 5.0
+
+
+def parse_retry_after(value):
+    # Seconds from a Retry-After header (delta-seconds or HTTP date), or None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def record_outcome(record, incremental=False):
+    # Classify a scraped record for the limiter. In incremental runs an empty
+    # transaction list just means nothing new, so it is not a warning sign.
+    if not isinstance(record['Transactions'], list):
+        return ERROR
+    if record['Transactions']:
+        return OK
+    if record['Overview'] == "Overview not found" and (record['URL'] or "").startswith("URL not found"):
+        return ERROR # Nothing from the profile rendered: an error or block page
+    return OK if incremental else EMPTY
+
+
+class TokenBucket(object):
+    # Not thread-safe on its own; DomainLimiter holds the lock
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, now):
+        # Takes a token and returns 0, or returns how long until one is available
+        if now < self.paused_until:
+            return self.paused_until - now
+        self.refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def pause(self, seconds, now):
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0.0
+
+
+class AimdController(object):
+    def __init__(self, initial=2, minimum=1, maximum=16, decrease=0.5, cooldown=2.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.cooldown = cooldown # One congestion event only halves the limit once
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.decreases = 0
+
+    def has_slot(self):
+        return self.in_flight < int(self.limit)
+
+    def on_success(self):
+        # +1 per full window of successes at the current limit
+        self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def on_backoff(self, now):
+        if now - self.last_decrease < self.cooldown:
+            return
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self.last_decrease = now
+        self.decreases += 1
+
+
+class HostState(object):
+    def __init__(self, rate, burst, initial_concurrency, max_concurrency):
+        self.bucket = TokenBucket(rate, burst)
+        self.controller = AimdController(initial_concurrency, maximum=max_concurrency)
+        self.empty_run = 0
+        self.counts = {OK: 0, SLOW: 0, ERROR: 0, THROTTLED: 0, EMPTY: 0}
+        self.wait_seconds = 0.0
+        self.peak_limit = float(initial_concurrency)
+
+
+class DomainLimiter(object):
+    # One instance is shared by all workers (threads or asyncio tasks). Call
+    # acquire(url) (or await acquire_async(url)) before every page request and
+    # release(url, outcome, latency) once the response has been judged.
+    # Follow-up requests made while the firm already holds a slot (its other
+    # transaction pages) pass slot=False to both: they only take a token.
+    def __init__(self, rate=2.0, burst=None, initial_concurrency=2, max_concurrency=16, slow_seconds=8.0,
+                 empty_streak=3):
+        self.rate = rate
+        self.burst = burst
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.slow_seconds = slow_seconds
+        self.empty_streak = empty_streak # Empty tombstone sets in a row that count as throttling
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def host(self, url):
+        netloc = urlsplit(url).netloc
+        if netloc not in self.hosts:
+            self.hosts[netloc] = HostState(self.rate, self.burst, self.initial_concurrency, self.max_concurrency)
+        return self.hosts[netloc]
+
+    def try_acquire(self, url, slot=True):
+        # Takes a slot and a token and returns 0, or returns how long to wait
+        with self.lock:
+            state = self.host(url)
+            if slot and not state.controller.has_slot():
+                return POLL_SECONDS
+            delay = state.bucket.try_take(time.monotonic())
+            if delay == 0.0 and slot:
+                state.controller.in_flight += 1
+            return delay
+
+    def acquire(self, url, slot=True):
+        waited = 0.0
+        while True:
+            delay = self.try_acquire(url, slot)
+            if delay == 0.0:
+                break
+            time.sleep(delay)
+            waited += delay
+        self.record_wait(url, waited)
+        return waited
+
+    async def acquire_async(self, url, slot=True):
+        waited = 0.0
+        while True:
+            delay = self.try_acquire(url, slot)
+            if delay == 0.0:
+                break
+            await asyncio.sleep(delay)
+            waited += delay
+        self.record_wait(url, waited)
+        return waited
+
+    def record_wait(self, url, waited):
+        metrics.observe(WAIT_PREFIX + 'rate_limit', waited)
+        with self.lock:
+            self.host(url).wait_seconds += waited
+
+    def release(self, url, outcome=OK, latency=None, retry_after=None, slot=True):
+        with self.lock:
+            now = time.monotonic()
+            state = self.host(url)
+            controller = state.controller
+            if slot:
+                controller.in_flight = max(0, controller.in_flight - 1)
+
+            if outcome == OK and latency is not None and latency > self.slow_seconds:
+                outcome = SLOW
+            state.counts[outcome] += 1
+            metrics.count(f"responses_{outcome}")
+            state.empty_run = state.empty_run + 1 if outcome == EMPTY else 0
+
+            if outcome == THROTTLED:
+                state.bucket.pause(retry_after if retry_after is not None else DEFAULT_RETRY_AFTER, now)
+            if outcome in BACKOFF_OUTCOMES or state.empty_run >= self.empty_streak:
+                controller.on_backoff(now)
+            elif outcome == OK:
+                controller.on_success()
+            state.peak_limit = max(state.peak_limit, controller.limit)
+            return outcome
+
+    def concurrency(self, url):
+        with self.lock:
+            return int(self.host(url).controller.limit)
+
+    def print_summary(self):
+        print(f"\n=== RATE LIMITER ===")
+        with self.lock:
+            for netloc, state in sorted(self.hosts.items()):
+                counts = ", ".join(f"{count} {outcome}" for outcome, count in state.counts.items())
+                print(f"{netloc}: {counts}; concurrency {int(state.controller.limit)} "
+                      f"(peak {int(state.peak_limit)}, {state.controller.decreases} backoffs), "
+                      f"{state.wait_seconds:.1f}s waiting for slots")
+
+
+def demo(args):
+    # Hammer the mock server from many threads and watch the limiter settle
+    import http_backend
+    from mock_axial_server import start_server
+
+    server, base_url = start_server(latency=args.latency, max_rps=args.max_rps)
+    limiter = DomainLimiter(rate=args.rate, max_concurrency=args.threads, slow_seconds=args.slow)
+    url = f"{base_url}/company/baymark-partners"
+    session = http_backend.create_session(args.threads)
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            list(executor.map(lambda _: http_backend.fetch_company(session, url, "Baymark Partners",
+                                                                   limiter=limiter),
+                              range(args.requests)))
+    finally:
+        server.shutdown()
+        session.close()
+    elapsed = time.perf_counter() - started
+    print(f"{args.requests} requests in {elapsed:.1f}s ({args.requests / elapsed:.1f}/s, "
+          f"server allows {args.max_rps}/s)")
+    limiter.print_summary()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exercise the rate limiter against the mock Axial server")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=20.0, help="limiter ceiling in requests per second")
+    parser.add_argument("--max-rps", type=float, default=5.0, help="mock server answers 429 above this rate")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock server base response time in seconds")
+    parser.add_argument("--slow", type=float, default=1.0, help="responses slower than this count as congestion")
+    demo(parser.parse_args())
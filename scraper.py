@@ -1,225 +1,547 @@
-import pandas as pd
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait # Corrected import
-from selenium.webdriver.support import expected_conditions as EC # Corrected import
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+import argparse
+import signal
+import sys
 import time
 
-# Read your Excel file
-df = pd.read_excel("Master PE List.xlsx")
+import http_backend
+import pagination
+import rate_limiter
+from driver_factory import DEFAULT_PROFILE_DIR, bytes_transferred, create_driver
+from job_ledger import JobLedger, record_hash, url_slug
+from master_list import load_valid_urls # Cached Title/url snapshot of the workbook
+from output_writers import open_writers
+from instrumentation import metrics
+from memory_watchdog import MB, MemoryWatchdog, browser_rss_bytes
+from page_cache import PageCache, content_hash
+from page_readiness import (NEXT_BUTTON_XPATH, OVERVIEW_HEADING_XPATH, SHOW_MORE_BUTTON_XPATH, PageReadiness,
+                            tombstone_signature)
+from page_text import PageTextIndex
+from rate_limiter import DomainLimiter
+from tombstones import extract_tombstones
+from transaction_history import TransactionHistory
 
-# Filter out rows where url is not None/empty and take only first 2 for demonstration
-valid_urls = df[df['url'].notna()].head(2)
 
-print(f"Found {len(valid_urls)} companies with valid URLs (limited to first 2 for demo)")
+# "js" reads all tombstones on a page in one execute_script call, "element" reads them one by one
+EXTRACTION_MODE = "js"
 
-# Setup Chrome driver
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service)
-wait = WebDriverWait(driver, 10) # Initialize WebDriverWait for explicit waits
 
-scraped_data = []
+class LazyBrowser(object):
+    # Starts Chrome only when a page actually needs the Selenium path, so runs
+    # served entirely over HTTP never launch a browser. The driver is recycled
+    # after recycle_after firms, or once Chrome's resident memory passes
+    # max_browser_mb, to stop its memory creeping up. Recycling happens between
+    # firms, so no work is lost.
+    def __init__(self, headless=False, profile_dir=DEFAULT_PROFILE_DIR, block_assets=True, recycle_after=50,
+                 max_browser_mb=None):
+        self.headless = headless
+        self.profile_dir = profile_dir
+        self.block_assets = block_assets
+        self.recycle_after = recycle_after
+        self.max_browser_mb = max_browser_mb
+        self.driver = None
+        self.wait = None
+        self.readiness = PageReadiness(None)
+        self.firms_since_start = 0
+        self.rss_mb = None # Chrome's memory after the last firm, when max_browser_mb is set
+        self.stats = {'starts': 0, 'startup_seconds': 0.0, 'firms': 0, 'bytes': 0, 'recycles': {}}
 
-try:
-    for index, row in valid_urls.iterrows():
-        print(f"\nProcessing: {row['Title']}")
+    def recycle(self, reason):
+        self.stats['recycles'][reason] = self.stats['recycles'].get(reason, 0) + 1
+        metrics.count('browser_recycles')
+        self.quit()
 
+    def get(self):
+        if self.driver is not None and self.recycle_after and self.firms_since_start >= self.recycle_after:
+            print(f"Recycling Chrome after {self.firms_since_start} firms")
+            self.recycle("firm limit")
+        elif self.driver is not None and self.max_browser_mb and (self.rss_mb or 0) > self.max_browser_mb:
+            print(f"Recycling Chrome at {self.rss_mb:.0f} MB (limit {self.max_browser_mb} MB)")
+            self.recycle("memory limit")
+        if self.driver is None:
+            self.driver, self.wait = create_driver(self.headless, self.profile_dir, self.block_assets,
+                                                   measure_bytes=True)
+            self.readiness.driver = self.driver
+            self.firms_since_start = 0
+            self.stats['starts'] += 1
+            self.stats['startup_seconds'] += self.driver.startup_seconds
+            bytes_transferred(self.driver) # Don't count startup traffic against the first firm
+        return self.driver, self.wait, self.readiness
+
+    def firm_done(self):
+        # Called once per firm, after its profile and every transactions page
+        # were loaded; returns the bytes they transferred
+        self.firms_since_start += 1
+        self.stats['firms'] += 1
+        firm_bytes = bytes_transferred(self.driver)
+        if firm_bytes is not None:
+            self.stats['bytes'] += firm_bytes
+        if self.max_browser_mb:
+            size = browser_rss_bytes(self.driver)
+            self.rss_mb = size / MB if size is not None else None
+        return firm_bytes
+
+    def is_alive(self):
         try:
-            # Open URL
-            driver.get(row['url'])
-            time.sleep(3)  # Give the page some time to load initially
-
-            # Get the full page text for keyword-based extraction
-            page_text = driver.find_element(By.TAG_NAME, "body").text
-
-            # Helper to extract section by keyword (for Overview and Location)
-            def extract_section(keyword_list):
-                lines = page_text.split('\n')
-                for keyword in keyword_list:
-                    start_idx = -1
-                    for i, line in enumerate(lines):
-                        if keyword.lower() in line.lower():
-                            start_idx = i
-                            break
-                    if start_idx != -1:
-                        section_lines = []
-                        # Look for content in the next few lines, stopping if a new heading or empty lines appear
-                        for i in range(start_idx + 1, min(start_idx + 15, len(lines))): # Increased range
-                            line_content = lines[i].strip()
-                            if not line_content: # Stop on empty lines
-                                break
-                            # Heuristic to stop if it looks like a new section heading
-                            if any(h_keyword.lower() in line_content.lower() for h_keyword in ["Overview", "Location", "Transactions", "Team", "Contact"]):
-                                break
-                            section_lines.append(line_content)
-                            if len(section_lines) >= 5: # Get a bit more text
-                                break
-                        return ' '.join(section_lines)
-                return None
+            self.driver.current_url
+            return True
+        except Exception:
+            return False
 
-            # --- Scrape Overview ---
-            overview_text = None
-            try:
-                # Try to find by heading first
-                heading = driver.find_element(By.XPATH, "//h2[contains(text(), 'Overview')] | //h3[contains(text(), 'Overview')] | //h4[contains(text(), 'Overview')]")
-                # Get text from the following sibling, often a paragraph or div
-                overview_text = heading.find_element(By.XPATH, "following-sibling::*[1]").text
-                print(f"✓ Found Overview by heading")
-            except Exception:
-                pass # If heading not found, try text search
-            if not overview_text or overview_text.strip() == "":
-                overview_text = extract_section(["Overview", "About Us", "Company Profile"])
-                if overview_text:
-                    print(f"✓ Found Overview by text search")
-            if not overview_text or overview_text.strip() == "":
-                overview_text = "Overview not found"
-
-            # --- Scrape Location ---
-            location_text = None
-            location_text = extract_section(["Location", "Address", "Contact"])
-            if location_text:
-                print(f"✓ Found Location by text search")
-            if not location_text or location_text.strip() == "":
-                location_text = "Location not found"
-
-            # --- Scrape URL from a.u-link ---
-            page_url = None
+    def quit(self):
+        if self.driver is not None:
             try:
-                # Corrected CSS selector to target the <a> tag with class u-link directly
-                link_elem = driver.find_element(By.CSS_SELECTOR, "a.u-link")
-                page_url = link_elem.get_attribute("href")
-                print(f"✓ Found page URL from a.u-link: {page_url}")
+                self.driver.quit()
             except Exception:
-                page_url = "URL not found in a.u-link"
-
-            # --- Scrape ALL Transactions ---
-            all_transactions = []
-            while True:
-                # Wait for transaction elements to be present
-                try:
-                    wait.until(EC.presence_of_all_elements_located((By.TAG_NAME, "axl-legacy-tombstone")))
-                except Exception:
-                    print("No more 'axl-legacy-tombstone' elements found or page did not load correctly.")
-                    break # Exit loop if no tombstone elements are found
-
-                tombstones = driver.find_elements(By.TAG_NAME, "axl-legacy-tombstone")
-                if not tombstones:
-                    print("No transactions found on current page.")
-                    break
+                pass
+        self.driver = None
+        self.wait = None
+        self.rss_mb = None
+
+    def print_summary(self):
+        if not self.stats['starts']:
+            return
+        print(f"\n=== BROWSER ===")
+        print(f"Chrome starts: {self.stats['starts']}, "
+              f"{self.stats['startup_seconds'] / self.stats['starts']:.2f}s avg startup")
+        if self.stats['firms']:
+            print(f"Firms: {self.stats['firms']}, "
+                  f"{self.stats['bytes'] / self.stats['firms'] / 1024:.0f} KB avg transferred per firm")
+
+
+def read_page_info(driver):
+    # PageInfo of the pagination control on the current page, None on the last page
+    try:
+        return pagination.browser_page_info(driver.execute_script(pagination.PAGINATION_JS))
+    except Exception:
+        return None
+
+
+def load_tombstone_page(driver, readiness, url, extraction_mode=EXTRACTION_MODE):
+    # Open one transactions page by URL; same result as http_backend.fetch_tombstone_page
+    driver.get(url)
+    metrics.count('pages')
+    tombstones = readiness.tombstones_present()
+    if not tombstones:
+        return [], None
+    metrics.count('tombstone_pages')
+    with metrics.timer('extract_tombstones'):
+        transactions = extract_tombstones(driver, tombstones, extraction_mode)
+    return transactions, read_page_info(driver)
+
+
+def click_through_pages(driver, readiness, collector, tombstones, extraction_mode=EXTRACTION_MODE):
+    # Reach every later page with the next button, as the site does
+    while not collector.done and collector.progress.pages < pagination.MAX_PAGES:
+        # Check for the next pagination button
+        next_button = None
+        try:
+            # Look for the button with the right arrow icon or text
+            # The screenshots show a `>` button. We need to find its selector.
+            # Assuming it's a button or div with a specific class or aria-label for 'next'
+            # Let's try finding the next button by its common attributes or structure
+            # Based on common patterns, it might be a button with a specific class or an SVG icon
+            # If there's a parent div for pagination, it would be good to target that.
+            # Let's assume the next button has an aria-label or a specific class like 'next-page' or contains an SVG for a right arrow.
+            # From the screenshot, it looks like a button within a pagination control.
+            # Let's try to find a button with an aria-label "Next page" or similar, or by its text content if it's visible.
+            # Since it's a generic looking arrow, let's try to find it by its SVG or a parent element.
+            # A common pattern is a button that is not disabled and contains an arrow icon.
+            next_button = driver.find_element(By.XPATH, NEXT_BUTTON_XPATH)
+            if "disabled" in next_button.get_attribute("class") or next_button.get_attribute("disabled"):
+                print("Next button is disabled. End of transactions.")
+                break
+            old_signature = tombstone_signature(driver)
+            with metrics.timer('pagination'):
+                next_button.click()
+                print("Clicked next page button.")
+                # Wait until the tombstones are replaced instead of sleeping
+                changed = readiness.tombstones_changed(tombstones, old_signature)
+            if not changed:
+                print("Transactions did not change after clicking next. Ending transaction scraping.")
+                break
+        except Exception as e:
+            print(f"No next pagination button found or it's disabled: {e}. Ending transaction scraping.")
+            break # Exit loop if no next button or error clicking it
+
+        # Wait for transaction elements to be present
+        tombstones = readiness.tombstones_present()
+        if not tombstones:
+            print("No transactions found on current page.")
+            break
+        metrics.count('tombstone_pages')
+        with metrics.timer('extract_tombstones'):
+            page_transactions = extract_tombstones(driver, tombstones, extraction_mode)
+        if not collector.add(page_transactions):
+            print("Page only repeats transactions already read. Ending transaction scraping.")
+            break
+    return collector.transactions
+
+
+def scrape_transactions(driver, readiness, extraction_mode=EXTRACTION_MODE, known_fingerprints=None, session=None,
+                        limiter=None):
+    # --- Scrape ALL Transactions ---
+    # With known_fingerprints, stop at the first transaction we already have.
+    # When the pagination control links to its pages they are loaded by URL
+    # (over HTTP with a session, several at once; otherwise in this browser),
+    # else the next button is clicked page by page. See pagination.py.
+    tombstones = readiness.tombstones_present()
+    if not tombstones:
+        print("No transactions found on current page.")
+        return []
+
+    metrics.count('tombstone_pages')
+    with metrics.timer('extract_tombstones'):
+        first_page = extract_tombstones(driver, tombstones, extraction_mode)
+    collector = pagination.PageCollector(first_page, known_fingerprints)
+    info = None if collector.done else read_page_info(driver)
+
+    if info is not None and info.direct:
+        transactions = None
+        if session is not None:
+            transactions = pagination.collect_pages(
+                info, first_page, lambda url: http_backend.fetch_tombstone_page(session, url, limiter=limiter),
+                known_fingerprints)
+        if transactions is None:
+            transactions = pagination.collect_pages(
+                info, first_page, lambda url: load_tombstone_page(driver, readiness, url, extraction_mode),
+                known_fingerprints, workers=1)
+        if transactions is not None:
+            print(f"✓ Read transaction pages by URL ({info.param}=2..)")
+            return transactions
+        # The page parameter did not move the list on: start again from page 1 and click
+        print("Transaction pages did not advance by URL, clicking through them instead")
+        driver.get(info.url)
+        tombstones = readiness.tombstones_present()
+        if not tombstones:
+            return collector.transactions
+
+    if collector.done:
+        print(f"Reached an already-stored transaction, {len(collector.transactions)} new. Ending transaction scraping.")
+        return collector.transactions
+    return click_through_pages(driver, readiness, collector, tombstones, extraction_mode)
+
+
+def scrape_company(driver, wait, row, readiness=None, extraction_mode=EXTRACTION_MODE, known_fingerprints=None,
+                   page_cache=None, session=None, limiter=None):
+    if readiness is None:
+        readiness = PageReadiness(driver)
+
+    lap = metrics.stopwatch()
+    # Open URL and wait until the profile has actually rendered
+    if not readiness.open(row['url']):
+        print("Profile content did not render in time, continuing with what is on the page.")
+    lap('page_load')
+
+    # --- Expand a truncated Overview ("Show full description") ---
+    try:
+        btn = driver.find_element(By.XPATH, SHOW_MORE_BUTTON_XPATH)
+        if btn.is_displayed():
+            driver.execute_script("arguments[0].click();", btn)
+            readiness.description_expanded()
+            print("✓ Expanded full description")
+    except Exception:
+        pass # Most profiles show the whole description
+    lap('description_expand')
+
+    # Get the full page text for keyword-based extraction, indexed once for all lookups
+    page_text = driver.find_element(By.TAG_NAME, "body").text
+
+    # An unchanged profile reuses the last record instead of extracting and paginating again
+    if page_cache is not None:
+        cached = page_cache.lookup(row['url'], content_hash(page_text))
+        if cached is not None:
+            print("✓ Profile unchanged since the last scrape, reusing the cached record")
+            return cached
+
+    page_index = PageTextIndex(page_text)
+
+    # --- Scrape Overview ---
+    overview_text = None
+    try:
+        # Try to find by heading first
+        heading = driver.find_element(By.XPATH, OVERVIEW_HEADING_XPATH)
+        # Get text from the following sibling, often a paragraph or div
+        overview_text = heading.find_element(By.XPATH, "following-sibling::*[1]").text
+        print(f"✓ Found Overview by heading")
+    except Exception:
+        pass # If heading not found, try text search
+    if not overview_text or overview_text.strip() == "":
+        overview_text = page_index.extract_section(["Overview", "About Us", "Company Profile"])
+        if overview_text:
+            print(f"✓ Found Overview by text search")
+    if not overview_text or overview_text.strip() == "":
+        overview_text = "Overview not found"
+    lap('overview')
+
+    # --- Scrape Location ---
+    location_text = None
+    location_text = page_index.extract_section(["Location", "Address", "Contact"])
+    if location_text:
+        print(f"✓ Found Location by text search")
+    if not location_text or location_text.strip() == "":
+        location_text = "Location not found"
+    lap('location')
+
+    # --- Scrape URL from a.u-link ---
+    page_url = None
+    try:
+        # Corrected CSS selector to target the <a> tag with class u-link directly
+        link_elem = driver.find_element(By.CSS_SELECTOR, "a.u-link")
+        page_url = link_elem.get_attribute("href") or "URL not found in a.u-link" # Anchor without an href
+        print(f"✓ Found page URL from a.u-link: {page_url}")
+    except Exception:
+        page_url = "URL not found in a.u-link"
+    lap('website_link')
+
+    all_transactions = scrape_transactions(driver, readiness, extraction_mode, known_fingerprints, session, limiter)
+    lap('transactions')
+
+    # Store the data
+    return {
+        'Title': row['Title'],
+        'Overview': overview_text,
+        'Location': location_text,
+        'URL': page_url,
+        'Transactions': all_transactions # Store the list of transactions
+    }
+
+
+def fetch_or_scrape(row, browser, session=None, history=None, limiter=None, page_cache=None):
+    # Try the lightweight HTTP backend first, fall back to the browser. With a
+    # TransactionHistory only new transactions are scraped and then merged
+    # into the stored ones. Both paths go through the shared DomainLimiter,
+    # and with a PageCache both reuse the last record of an unchanged page.
+    slug = url_slug(row['url'])
+    known_fingerprints = history.known_fingerprints(slug) if history is not None else None
+
+    record = None
+    if session is not None:
+        record = http_backend.fetch_company(session, row['url'], row['Title'], known_fingerprints, limiter=limiter,
+                                            page_cache=page_cache)
+        if record is not None:
+            print(f"✓ Parsed profile over HTTP")
+        else:
+            print("HTTP parse incomplete, falling back to Selenium")
+    if record is None:
+        driver, wait, readiness = browser.get()
+        if limiter is not None:
+            limiter.acquire(row['url'])
+        outcome = rate_limiter.ERROR
+        try:
+            record = scrape_company(driver, wait, row, readiness, known_fingerprints=known_fingerprints,
+                                    page_cache=page_cache, session=session, limiter=limiter)
+            outcome = rate_limiter.record_outcome(record, bool(known_fingerprints))
+        finally:
+            browser.firm_done()
+            if limiter is not None:
+                limiter.release(row['url'], outcome, readiness.last_load_seconds)
+
+    if page_cache is not None and page_cache.reused(row['url']):
+        page_cache.forget(row['url'])
+        return record # Already merged with the history when it was cached
+    if history is not None:
+        new_count = len(record['Transactions'])
+        record['Transactions'] = history.merge(slug, record['Transactions'])
+        print(f"✓ {new_count} new transactions, {len(record['Transactions'])} in history")
+    if page_cache is not None:
+        page_cache.store(row['url'], record)
+    return record
 
-                for tombstone in tombstones:
-                    try:
-                        # Extracting party, activity, company name
-                        parties = tombstone.find_elements(By.CLASS_NAME, "tombstone-party")
-                        acquirer_investor = parties[0].text if len(parties) > 0 else "N/A"
-                        company_name = parties[1].text if len(parties) > 1 else "N/A"
-
-                        activity_elem = tombstone.find_element(By.CLASS_NAME, "tombstone-activity")
-                        activity = activity_elem.text if activity_elem else "N/A"
-
-                        # Extracting industry and date from the footer div
-                        footer_div = tombstone.find_element(By.CLASS_NAME, "footer")
-                        footer_spans = footer_div.find_elements(By.CSS_SELECTOR, "span.u-text-xs-01.u-text-color-secondary")
-
-                        industry = footer_spans[0].text if len(footer_spans) > 0 else "N/A"
-                        date = footer_spans[1].text if len(footer_spans) > 1 else "N/A"
-
-                        all_transactions.append({
-                            'Acquirer/Investor': acquirer_investor,
-                            'Activity': activity,
-                            'Company': company_name,
-                            'Industry': industry,
-                            'Date': date
-                        })
-                    except Exception as e:
-                        print(f"Warning: Could not scrape one transaction: {e}")
-                        # Append partial data or a placeholder if an error occurs for a single transaction
-                        all_transactions.append({
-                            'Acquirer/Investor': 'Error',
-                            'Activity': 'Error',
-                            'Company': 'Error',
-                            'Industry': 'Error',
-                            'Date': 'Error'
-                        })
-
-                # Check for the next pagination button
-                next_button = None
-                try:
-                    # Look for the button with the right arrow icon or text
-                    # The screenshots show a `>` button. We need to find its selector.
-                    # Assuming it's a button or div with a specific class or aria-label for 'next'
-                    # Let's try finding the next button by its common attributes or structure
-                    # Based on common patterns, it might be a button with a specific class or an SVG icon
-                    # If there's a parent div for pagination, it would be good to target that.
-                    # Let's assume the next button has an aria-label or a specific class like 'next-page' or contains an SVG for a right arrow.
-                    # From the screenshot, it looks like a button within a pagination control.
-                    # Let's try to find a button with an aria-label "Next page" or similar, or by its text content if it's visible.
-                    # Since it's a generic looking arrow, let's try to find it by its SVG or a parent element.
-                    # A common pattern is a button that is not disabled and contains an arrow icon.
-                    next_button = driver.find_element(By.XPATH, "//button[contains(@aria-label, 'Next page') or contains(@class, 'pagination-next')] | //button[./*[name()='svg' and contains(@data-icon, 'arrow-right')]] | //button[contains(., '>') and not(@disabled)]")
-                    if "disabled" in next_button.get_attribute("class") or next_button.get_attribute("disabled"):
-                        print("Next button is disabled. End of transactions.")
-                        break
-                    next_button.click()
-                    print("Clicked next page button.")
-                    time.sleep(3) # Wait for the next page to load
-                except Exception as e:
-                    print(f"No next pagination button found or it's disabled: {e}. Ending transaction scraping.")
-                    break # Exit loop if no next button or error clicking it
-
-            # Store the data
-            scraped_data.append({
-                'Title': row['Title'],
-                'Overview': overview_text,
-                'Location': location_text,
-                'URL': page_url,
-                'Transactions': all_transactions # Store the list of transactions
-            })
-
-            print(f"✓ Scraped: {row['Title']}")
 
+def error_record(row, e):
+    return {
+        'Title': row['Title'],
+        'Overview': f"Error: {str(e)}",
+        'Location': "Error",
+        'Transactions': "Error", # Error string instead of a list of transactions
+        'URL': "Error"
+    }
+
+
+def scrape_job(job, ledger, browser, session=None, writer=None, history=None, limiter=None, page_cache=None):
+    # Scrape one firm claimed from the ledger, stream it to the writer and
+    # record the outcome. Returns the record that was written, or None if the
+    # firm will be retried.
+    with metrics.firm(job['Title']):
+        try:
+            record = fetch_or_scrape(job, browser, session, history, limiter, page_cache)
         except Exception as e:
-            print(f"✗ Error processing {row['Title']}: {str(e)}")
-            scraped_data.append({
-                'Title': row['Title'],
-                'Overview': f"Error: {str(e)}",
-                'Location': "Error",
-                'Transaction': "Error", # Keep "Transaction" for consistency, but it will be an error string
-                'URL': "Error"
-            })
-
-        time.sleep(2) # Short pause between companies
-
-finally:
-    print(f"\n=== SCRAPING COMPLETE ===")
-    print(f"Total companies processed: {len(scraped_data)}")
-
-    # Save to TXT file
-    with open("scraped_data.txt", "w", encoding="utf-8") as f:
-        for data in scraped_data:
-            f.write(f"Title: {data['Title']}\n")
-            f.write(f"Overview: {data['Overview']}\n")
-            f.write(f"Location: {data['Location']}\n")
-            f.write(f"URL: {data['URL']}\n")
-            f.write(f"--- Transactions ---\n")
-            if isinstance(data['Transactions'], list):
-                if data['Transactions']:
-                    for i, transaction in enumerate(data['Transactions']):
-                        f.write(f"  Transaction {i+1}:\n")
-                        f.write(f"    Acquirer/Investor: {transaction.get('Acquirer/Investor', 'N/A')}\n")
-                        f.write(f"    Activity: {transaction.get('Activity', 'N/A')}\n")
-                        f.write(f"    Company: {transaction.get('Company', 'N/A')}\n")
-                        f.write(f"    Industry: {transaction.get('Industry', 'N/A')}\n")
-                        f.write(f"    Date: {transaction.get('Date', 'N/A')}\n")
-                else:
-                    f.write("  No transactions found.\n")
-            else: # Handle the case where 'Transactions' might be an error string
-                f.write(f"  {data['Transactions']}\n")
-            f.write("\n")  # blank line between companies
-
-    print(f"Results saved to 'scraped_data.txt'")
-
-    input("Press Enter to close browser...")
-    driver.quit()
+            print(f"✗ Error processing {job['Title']}: {str(e)}")
+            if page_cache is not None:
+                page_cache.forget(job['url'])
+            if ledger.mark_failed(job['slug'], e):
+                print(f"Will retry {job['Title']} later (attempt {job['attempts'] + 1} of {ledger.max_attempts})")
+                metrics.count('retries')
+                return None
+            metrics.count('errors')
+            record = error_record(job, e)
+            if writer is not None:
+                with metrics.timer('write'):
+                    writer.write(record)
+            return record
+
+        # Save before marking done: a crash in between repeats the firm rather than losing it
+        if writer is not None:
+            with metrics.timer('write'):
+                writer.write(record)
+        ledger.mark_done(job['slug'], record_hash(record))
+        print(f"✓ Scraped: {job['Title']}")
+        return record
+
+
+# "http" tries the lightweight HTTP backend first, "selenium" always renders in Chrome
+FETCH_BACKEND = "http"
+
+# Any of "text" (scraped_data.txt), "jsonl" (scraped_data.jsonl), "parquet" (scraped_data_parquet/),
+# "deals" (the deduplicated deal index in deals.db)
+OUTPUT_FORMATS = ["text", "jsonl"]
+
+# Only scrape transactions newer than the stored history for each firm
+INCREMENTAL = True
+
+# Scrape every firm again, even those the ledger has as done (e.g. the weekly refresh)
+REFRESH = False
+
+# Where the end-of-run metrics are saved (None to skip), and an optional port
+# serving them as Prometheus text while the run is going
+METRICS_PATH = "scrape_metrics.json"
+METRICS_PORT = None
+
+# Reuse the last record of profiles whose page has not changed (None to always
+# extract); entries older than PAGE_CACHE_TTL seconds are scraped in full again
+PAGE_CACHE_PATH = "page_cache.db"
+PAGE_CACHE_TTL = 7 * 24 * 3600
+
+# Ceiling on page requests per second to axial.net; the limiter backs off below
+# it when responses get slow, error out or come back 429
+REQUESTS_PER_SECOND = 0.5
+
+# Without --long-run only the first few firms are scraped, as a demonstration
+DEMO_LIMIT = 2
+
+# --long-run: every firm, nothing waits for Enter, Chrome is restarted past
+# LONG_RUN_BROWSER_MB, and once Python itself stays past LONG_RUN_PYTHON_MB the
+# run stops cleanly with EXIT_RESUME so a supervisor can start it again
+# (the job ledger skips the firms already done)
+LONG_RUN_BROWSER_MB = 1500
+LONG_RUN_PYTHON_MB = 1024
+EXIT_RESUME = 75
+
+
+def stop_on_sigterm():
+    # Let `kill` (or a scheduler's timeout) unwind through the finally blocks,
+    # so writers are closed and the ledger is consistent
+    def handler(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape Axial profiles with one browser")
+    parser.add_argument("--long-run", action="store_true",
+                        help="scrape every firm unattended, restarting Chrome to keep memory flat")
+    parser.add_argument("--limit", type=int, default=None,
+                        help=f"only scrape the first N firms (default {DEMO_LIMIT}, all with --long-run)")
+    parser.add_argument("--recycle-after", type=int, default=50, help="restart Chrome after N firms")
+    parser.add_argument("--max-browser-mb", type=float, default=None,
+                        help=f"restart Chrome above this resident memory (--long-run: {LONG_RUN_BROWSER_MB})")
+    parser.add_argument("--max-python-mb", type=float, default=None,
+                        help=f"stop cleanly above this Python memory (--long-run: {LONG_RUN_PYTHON_MB})")
+    parser.add_argument("--unattended", action="store_true", help="never wait for Enter before closing Chrome")
+    args = parser.parse_args()
+
+    limit = args.limit if args.limit is not None else (None if args.long_run else DEMO_LIMIT)
+    max_browser_mb = args.max_browser_mb or (LONG_RUN_BROWSER_MB if args.long_run else None)
+    max_python_mb = args.max_python_mb or (LONG_RUN_PYTHON_MB if args.long_run else None)
+    unattended = args.unattended or args.long_run or not sys.stdin.isatty()
+
+    valid_urls = load_valid_urls()
+    if limit is not None:
+        valid_urls = valid_urls.head(limit)
+
+    print(f"Found {len(valid_urls)} companies with valid URLs"
+          + (f" (limited to first {limit})" if limit is not None else ""))
+
+    # Firms finished by an earlier run are skipped, failed ones retried with backoff
+    ledger = JobLedger()
+    fresh_run = REFRESH or not ledger.has_completed()
+    ledger.sync(row for _, row in valid_urls.iterrows())
+    if REFRESH:
+        ledger.requeue_all()
+
+    # Each firm is written as soon as it finishes
+    writer = open_writers(OUTPUT_FORMATS)
+    if fresh_run:
+        writer.truncate()
+
+    history = TransactionHistory() if INCREMENTAL else None
+    limiter = DomainLimiter(rate=REQUESTS_PER_SECOND, initial_concurrency=1, max_concurrency=1)
+    page_cache = PageCache(PAGE_CACHE_PATH, ttl=PAGE_CACHE_TTL) if PAGE_CACHE_PATH else None
+
+    if METRICS_PORT is not None:
+        metrics.serve(METRICS_PORT)
+
+    browser = LazyBrowser(recycle_after=args.recycle_after, max_browser_mb=max_browser_mb)
+    watchdog = MemoryWatchdog(max_python_mb)
+    stop_on_sigterm()
+    session = None
+    if FETCH_BACKEND == "http":
+        session = http_backend.create_session()
+
+    processed = 0
+
+    try:
+        while True:
+            job = ledger.claim_next()
+            if job is None:
+                delay = ledger.seconds_until_next_retry()
+                if delay is None:
+                    break
+                print(f"Waiting {delay:.0f}s before retrying failed companies")
+                time.sleep(delay)
+                continue
+
+            print(f"\nProcessing: {job['Title']}")
+            scrape_job(job, ledger, browser, session, writer, history, limiter, page_cache)
+            processed += 1
+
+            stop_reason = watchdog.after_firm(browser)
+            if stop_reason:
+                print(f"\n✗ {stop_reason}, stopping so the next run starts with fresh memory")
+                break
+
+    except KeyboardInterrupt:
+        # Firms already written stay done; the interrupted one is redone next run
+        print("\nInterrupted, stopping. Run again to resume.")
+
+    finally:
+        print(f"\n=== SCRAPING COMPLETE ===")
+        print(f"Total companies processed this run: {processed}")
+        writer.close()
+        print(f"Results saved as {', '.join(OUTPUT_FORMATS)}")
+        ledger.print_summary()
+        limiter.print_summary()
+        if page_cache is not None:
+            page_cache.print_summary()
+        browser.readiness.print_summary()
+        browser.print_summary()
+        watchdog.print_summary(browser)
+        metrics.print_summary()
+        if METRICS_PATH:
+            metrics.write_json(METRICS_PATH)
+
+        if browser.driver is not None and not unattended:
+            input("Press Enter to close browser...")
+        browser.quit()
+        ledger.close()
+        if history is not None:
+            history.close()
+        if page_cache is not None:
+            page_cache.close()
+
+    return EXIT_RESUME if watchdog.stop_reason else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
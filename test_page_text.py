@@ -0,0 +1,93 @@
+# PageTextIndex.extract_section must return exactly what the original
+# per-call scan in initial-scraper-code.py returned.
+#
+#   python -m pytest -q test_page_text.py
+import random
+
+from page_text import HEADING_KEYWORDS, PageTextIndex, extract_section
+
+
+def baseline_extract_section(page_text, keyword_list):
+    # The original algorithm, kept verbatim as the reference
+    lines = page_text.split('\n')
+    for keyword in keyword_list:
+        start_idx = -1
+        for i, line in enumerate(lines):
+            if keyword.lower() in line.lower():
+                start_idx = i
+                break
+        if start_idx != -1:
+            section_lines = []
+            for i in range(start_idx + 1, min(start_idx + 15, len(lines))):
+                line_content = lines[i].strip()
+                if not line_content:
+                    break
+                if any(h_keyword.lower() in line_content.lower() for h_keyword in HEADING_KEYWORDS):
+                    break
+                section_lines.append(line_content)
+                if len(section_lines) >= 5:
+                    break
+            return ' '.join(section_lines)
+    return None
+
+
+def check(page_text, keyword_list):
+    expected = baseline_extract_section(page_text, keyword_list)
+    assert PageTextIndex(page_text).extract_section(keyword_list) == expected
+    assert extract_section(page_text, keyword_list) == expected
+    return expected
+
+
+def test_stops_at_next_heading():
+    page = "Overview\nWe buy founder-owned businesses.\nLocation\nDenver, CO"
+    assert check(page, ["Overview"]) == "We buy founder-owned businesses."
+    assert check(page, ["Location"]) == "Denver, CO"
+
+
+def test_heading_keyword_inside_a_line_stops_too():
+    page = "Overview\nFirst line\nOur team of ten\nNot reached"
+    assert check(page, ["Overview"]) == "First line"
+
+
+def test_stops_at_empty_line():
+    page = "Overview\nOne\n   \nTwo"
+    assert check(page, ["Overview"]) == "One"
+
+
+def test_keeps_at_most_five_lines():
+    page = "Overview\n" + "\n".join(f"line {i}" for i in range(10))
+    assert check(page, ["Overview"]) == "line 0 line 1 line 2 line 3 line 4"
+
+
+def test_window_is_clipped_at_the_end_of_the_page():
+    # With the five-line cap the 15-line window only matters near the end of the text
+    page = "\n".join(f"filler {i}" for i in range(20)) + "\nOverview\nlast"
+    assert check(page, ["Overview"]) == "last"
+    assert check(page + "\n", ["Overview"]) == "last"
+    assert check("intro\nOverview", ["Overview"]) == ""
+
+
+def test_first_keyword_found_wins_and_missing_returns_none():
+    page = "Headquarters\nBoston\n\nLocation\nDenver"
+    assert check(page, ["Location", "Headquarters"]) == "Denver"
+    assert check(page, ["Address", "Headquarters"]) == "Boston"
+    assert check(page, ["Address"]) is None
+
+
+def test_unicode_case_folding():
+    # Lowercasing "İ" adds a character; line numbers must still line up
+    page = "İİİ İSTANBUL\nÜBERSICHT\nFür Familienunternehmen\nOVERVIEW\nStraße 1\nLOCATİON\nİzmir"
+    assert check(page, ["übersicht"]) == "Für Familienunternehmen"
+    assert check(page, ["Overview"]) == "Straße 1 LOCATİON İzmir"
+    assert check(page, ["straße"]) == "LOCATİON İzmir"
+
+
+def test_matches_baseline_on_random_pages():
+    rng = random.Random(0)
+    words = ["Overview", "Location", "Transactions", "Team", "Contact", "İstanbul", "ÜBER", "deal",
+             "Denver", "  ", "", "straße", "OVERVIEW", "growth equity"]
+    for _ in range(2000):
+        lines = [" ".join(rng.choice(words) for _ in range(rng.randint(0, 3))) for _ in range(rng.randint(0, 40))]
+        page = "\n".join(lines)
+        keywords = rng.sample(["Overview", "Location", "Headquarters", "über", "deal", "team"], rng.randint(1, 3))
+        check(page, keywords)
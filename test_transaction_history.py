@@ -0,0 +1,40 @@
+# TransactionHistory.merge keeps repeated deals and survives a failed insert.
+#
+#   python -m pytest -q test_transaction_history.py
+import pytest
+
+from transaction_history import TransactionHistory, take_until_known
+
+
+def deal(company, date="June 2025"):
+    return {'Acquirer/Investor': "Harbor Ridge Capital", 'Activity': "ACQUIRED", 'Company': company,
+            'Industry': "IT Services", 'Date': date}
+
+
+@pytest.fixture
+def history(tmp_path):
+    store = TransactionHistory(str(tmp_path / "history.db"))
+    yield store
+    store.close()
+
+
+def test_identical_tombstones_are_all_kept(history):
+    page = [deal("Acme"), deal("Acme"), deal("Globex")]
+    assert history.merge("harbor-ridge", page) == page
+    # A later run that finds the same page again stores nothing new
+    new, reached_known = take_until_known(page, history.known_fingerprints("harbor-ridge"))
+    assert (new, reached_known) == ([], True)
+    assert history.merge("harbor-ridge", new) == page
+
+
+def test_repeat_of_a_stored_deal_is_added_in_front(history):
+    history.merge("harbor-ridge", [deal("Acme")])
+    assert history.merge("harbor-ridge", [deal("Acme")]) == [deal("Acme"), deal("Acme")]
+
+
+def test_failed_merge_rolls_back_and_the_next_one_works(history):
+    broken = dict(deal("Initech"), Industry={"not": "storable"})
+    with pytest.raises(Exception):
+        history.merge("harbor-ridge", [deal("Acme"), broken])
+    assert history.history("harbor-ridge") == []
+    assert history.merge("harbor-ridge", [deal("Globex")]) == [deal("Globex")]
@@ -0,0 +1,95 @@
+# Transaction (tombstone) extraction from a rendered profile page.
+#
+# "element" mode walks each axl-legacy-tombstone with find_element(s) and
+# .text, which costs 8-10 WebDriver round-trips per transaction. "js" mode
+# reads every tombstone on the page with a single execute_script call and
+# returns the same Acquirer/Investor, Activity, Company, Industry and Date
+# fields.
+from selenium.webdriver.common.by import By
+
+FOOTER_SPAN_SELECTOR = "span.u-text-xs-01.u-text-color-secondary"
+
+# Function body: runs as-is through driver.execute_script, or wrapped in
+# "() => { ... }" for engines that evaluate expressions
+TOMBSTONE_JS = """
+var text = function (el) { return el ? (el.innerText || '').trim() : 'N/A'; };
+return Array.from(document.getElementsByTagName('axl-legacy-tombstone')).map(function (t) {
+    var parties = t.getElementsByClassName('tombstone-party');
+    var activity = t.getElementsByClassName('tombstone-activity')[0];
+    var footer = t.getElementsByClassName('footer')[0];
+    if (!activity || !footer) { return null; }
+    var spans = footer.querySelectorAll('""" + FOOTER_SPAN_SELECTOR + """');
+    return {
+        'Acquirer/Investor': text(parties[0]),
+        'Activity': text(activity),
+        'Company': text(parties[1]),
+        'Industry': text(spans[0]),
+        'Date': text(spans[1])
+    };
+});
+"""
+
+
+def error_transaction():
+    # Placeholder written when a single tombstone cannot be read
+    return {
+        'Acquirer/Investor': 'Error',
+        'Activity': 'Error',
+        'Company': 'Error',
+        'Industry': 'Error',
+        'Date': 'Error'
+    }
+
+
+def extract_tombstones_js(driver):
+    records = driver.execute_script(TOMBSTONE_JS) or []
+    transactions = []
+    for record in records:
+        if record is None:
+            print("Warning: Could not scrape one transaction: missing activity or footer")
+            transactions.append(error_transaction())
+        else:
+            transactions.append(record)
+    return transactions
+
+
+def extract_tombstones_per_element(tombstones):
+    transactions = []
+    for tombstone in tombstones:
+        try:
+            # Extracting party, activity, company name
+            parties = tombstone.find_elements(By.CLASS_NAME, "tombstone-party")
+            acquirer_investor = parties[0].text if len(parties) > 0 else "N/A"
+            company_name = parties[1].text if len(parties) > 1 else "N/A"
+
+            activity_elem = tombstone.find_element(By.CLASS_NAME, "tombstone-activity")
+            activity = activity_elem.text if activity_elem else "N/A"
+
+            # Extracting industry and date from the footer div
+            footer_div = tombstone.find_element(By.CLASS_NAME, "footer")
+            footer_spans = footer_div.find_elements(By.CSS_SELECTOR, FOOTER_SPAN_SELECTOR)
+
+            industry = footer_spans[0].text if len(footer_spans) > 0 else "N/A"
+            date = footer_spans[1].text if len(footer_spans) > 1 else "N/A"
+
+            transactions.append({
+                'Acquirer/Investor': acquirer_investor,
+                'Activity': activity,
+                'Company': company_name,
+                'Industry': industry,
+                'Date': date
+            })
+        except Exception as e:
+            print(f"Warning: Could not scrape one transaction: {e}")
+            # Append partial data or a placeholder if an error occurs for a single transaction
+            transactions.append(error_transaction())
+    return transactions
+
+
+def extract_tombstones(driver, tombstones, mode="js"):
+    if mode == "js":
+        try:
+            return extract_tombstones_js(driver)
+        except Exception as e:
+            print(f"Warning: bulk tombstone extraction failed ({e}), reading tombstones one by one")
+    return extract_tombstones_per_element(tombstones)
@@ -0,0 +1,107 @@
+# Per-firm transaction history for incremental re-scrapes.
+#
+# New deals show up at the top of the first transactions page, so once we
+# reach a tombstone we already stored (same acquirer, company, activity and
+# date) everything after it is known too and pagination can stop. New deals
+# are merged in front of the stored history.
+#
+# A firm can list the same deal twice (identical tombstones). Every copy is
+# stored: the second one under the fingerprint with "#1" appended, the third
+# with "#2", and so on, so the history never has fewer deals than the page.
+import hashlib
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+
+TRANSACTION_FIELDS = ('Acquirer/Investor', 'Activity', 'Company', 'Industry', 'Date')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    slug TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    acquirer TEXT,
+    activity TEXT,
+    company TEXT,
+    industry TEXT,
+    date TEXT,
+    first_seen TEXT NOT NULL,
+    PRIMARY KEY (slug, fingerprint)
+);
+CREATE INDEX IF NOT EXISTS transactions_rank ON transactions (slug, rank);
+"""
+
+
+def is_placeholder(transaction):
+    return transaction.get('Activity') == 'Error'
+
+
+def transaction_fingerprint(transaction):
+    parts = (transaction.get(key, 'N/A') for key in ('Acquirer/Investor', 'Company', 'Activity', 'Date'))
+    normalized = "\u0001".join(" ".join(str(part).split()).lower() for part in parts)
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def take_until_known(transactions, known_fingerprints):
+    # Returns (new transactions, True if we reached one we already have)
+    new = []
+    for transaction in transactions:
+        if not is_placeholder(transaction) and transaction_fingerprint(transaction) in known_fingerprints:
+            return new, True
+        new.append(transaction)
+    return new, False
+
+
+class TransactionHistory(object):
+    def __init__(self, path="transaction_history.db"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def known_fingerprints(self, slug):
+        with self.lock:
+            rows = self.conn.execute("SELECT fingerprint FROM transactions WHERE slug = ?", (slug,)).fetchall()
+        return {fingerprint for (fingerprint,) in rows}
+
+    def history(self, slug):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT acquirer, activity, company, industry, date FROM transactions WHERE slug = ? ORDER BY rank",
+                (slug,)).fetchall()
+        return [dict(zip(TRANSACTION_FIELDS, ('N/A' if value is None else value for value in row))) for row in rows]
+
+    def merge(self, slug, new_transactions):
+        # Store the new deals ahead of the existing ones and return the full
+        # history, newest first. Error placeholders are passed through for
+        # this run's output but never stored.
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        stored = [t for t in new_transactions if not is_placeholder(t)]
+        with self.lock:
+            lowest = self.conn.execute("SELECT MIN(rank) FROM transactions WHERE slug = ?", (slug,)).fetchone()[0]
+            start = (lowest if lowest is not None else 0) - len(stored)
+            # Copies of each deal already stored, so a repeated one gets the next "#n"
+            copies = Counter(fingerprint.split("#")[0] for (fingerprint,) in self.conn.execute(
+                "SELECT fingerprint FROM transactions WHERE slug = ?", (slug,)))
+            self.conn.execute("BEGIN")
+            try:
+                for offset, transaction in enumerate(stored):
+                    fingerprint = transaction_fingerprint(transaction)
+                    copy = copies[fingerprint]
+                    copies[fingerprint] += 1
+                    self.conn.execute(
+                        "INSERT OR IGNORE INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (slug, start + offset, f"{fingerprint}#{copy}" if copy else fingerprint,
+                         *(transaction.get(key, 'N/A') for key in TRANSACTION_FIELDS), now))
+            except BaseException:
+                # Leave the shared connection outside a transaction for the next merge
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+        placeholders = [t for t in new_transactions if is_placeholder(t)]
+        return placeholders + self.history(slug)
+
+    def close(self):
+        self.conn.close()